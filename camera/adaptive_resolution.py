@@ -0,0 +1,40 @@
+from collections import deque
+
+
+class ResolutionController:
+    # update+draw の処理時間の移動平均を見て、解像度インデックスを上下させる
+    # ヒステリシス: 予算の high 倍を超えたら下げ、low 倍を下回ったら上げる（変更後は cooldown フレーム待つ）
+    def __init__(self, budget_ms=12.0, window=30, high=0.9, low=0.5, cooldown=30):
+        self.budget_ms = budget_ms
+        self.high = high
+        self.low = low
+        self.cooldown = cooldown
+        self.times = deque(maxlen=window)
+        self._wait = 0
+
+    def record(self, elapsed_ms):
+        self.times.append(elapsed_ms)
+
+    def average(self):
+        return sum(self.times) / len(self.times) if self.times else 0.0
+
+    def adjust(self, index, num_levels):
+        # 新しいインデックスを返す（窓が埋まるまでと cooldown 中は据え置き）
+        if self._wait > 0:
+            self._wait -= 1
+            return index
+        if len(self.times) < self.times.maxlen:
+            return index
+
+        avg = self.average()
+        if avg > self.budget_ms * self.high and index > 0:
+            index -= 1
+        elif avg < self.budget_ms * self.low and index < num_levels - 1:
+            index += 1
+        else:
+            return index
+
+        # 解像度が変わったら計測し直す
+        self.times.clear()
+        self._wait = self.cooldown
+        return index
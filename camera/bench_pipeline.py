@@ -0,0 +1,100 @@
+"""カメラ処理パイプラインのヘッドレス・ベンチマーク
+
+カメラもウィンドウも使わずに、解像度候補ごとに各段の処理時間を計測する。
+
+    python bench_pipeline.py                      # 合成映像
+    python bench_pipeline.py --source video.mp4   # 動画ファイル
+    python bench_pipeline.py --source session.raw # 記録した生フレーム（memmap で全速再生）
+    python bench_pipeline.py --json result.json   # 結果を JSON で保存
+"""
+import argparse
+import json
+import time
+
+import cv2
+import pyxel
+from frame_source import open_source
+from frame_utils import build_gray_lut, crop_center_square, palette_rgb, upload_indices
+from remap import RemapCache
+
+RES_LIST = [24, 36, 48, 64, 72, 80, 96, 128, 160, 196, 224, 256]
+STAGES = ["capture", "gray", "crop", "resize", "rotate", "quantize", "upload"]
+
+# カメラアプリと同じ 16 階調グレースケールパレット（白→黒）
+GRAY_COLORS = [(g << 16) | (g << 8) | g for g in reversed([int(j * 255 / 15) for j in range(16)])]
+
+
+def run_pipeline(source, res, frames, angle, lut, remap, image):
+    # gray_scale_camera.py（縮小→減色→拡大）と gray_scale_rotate_camera.py（回転ギャザー）の
+    # 両方の経路を 1 フレームずつ流し、段ごとの合計時間 [ns] を返す
+    totals = dict.fromkeys(STAGES, 0)
+    clock = time.perf_counter_ns
+    for _ in range(frames):
+        t0 = clock()
+        ret, frame = source.read()
+        if not ret:
+            break
+        t1 = clock()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        t2 = clock()
+        square = crop_center_square(gray)
+        t3 = clock()
+        small = cv2.resize(square, (res, res), interpolation=cv2.INTER_AREA)
+        t4 = clock()
+        small_indices = lut[small]
+        t5 = clock()
+        indices = cv2.resize(small_indices, (256, 256), interpolation=cv2.INTER_NEAREST)
+        t6 = clock()
+        rotated = remap.apply(gray, res, angle)
+        t7 = clock()
+        rotated_indices = lut[rotated]
+        t8 = clock()
+        upload_indices(image, indices)
+        upload_indices(image, rotated_indices)
+        t9 = clock()
+
+        totals["capture"] += t1 - t0
+        totals["gray"] += t2 - t1
+        totals["crop"] += t3 - t2
+        totals["resize"] += (t4 - t3) + (t6 - t5)
+        totals["rotate"] += t7 - t6
+        totals["quantize"] += (t5 - t4) + (t8 - t7)
+        totals["upload"] += t9 - t8
+    return {stage: totals[stage] / frames / 1e6 for stage in STAGES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="カメラ処理パイプラインのベンチマーク")
+    parser.add_argument("--source", default="synthetic", help="synthetic / カメラ番号 / 動画ファイル / *.raw")
+    parser.add_argument("--frames", type=int, default=100, help="解像度ごとの計測フレーム数")
+    parser.add_argument("--angle", type=float, default=30.0, help="回転段の角度")
+    parser.add_argument("--json", help="結果の保存先（JSON）")
+    args = parser.parse_args()
+
+    # 合成映像・生フレームは待ち時間なし（全速）で読む
+    source = open_source(args.source, realtime=False)
+    lut = build_gray_lut(palette_rgb(GRAY_COLORS), gain=1.5)
+    remap = RemapCache(out_size=256, max_entries=len(RES_LIST))
+    image = pyxel.Image(256, 256)
+
+    # ウォームアップ（インデックス表の生成を計測から外す）
+    for res in RES_LIST:
+        run_pipeline(source, res, 1, args.angle, lut, remap, image)
+
+    results = {}
+    print("res  " + "".join(f"{stage:>10}" for stage in STAGES) + f"{'total':>10}  [ms/frame]")
+    for res in RES_LIST:
+        timing = run_pipeline(source, res, args.frames, args.angle, lut, remap, image)
+        results[res] = timing
+        row = "".join(f"{timing[stage]:10.3f}" for stage in STAGES)
+        print(f"{res:<5}{row}{sum(timing.values()):10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"source": args.source, "frames": args.frames, "angle": args.angle,
+                       "results": results}, f, indent=2)
+    source.release()
+
+
+if __name__ == "__main__":
+    main()
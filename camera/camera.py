@@ -1,50 +1,58 @@
 import pyxel
 import cv2
-from PIL import Image
-import tempfile
-import os
+from capture import FrameGrabber
+from dirty_tiles import FrameChangeDetector, TileUploader
+from frame_source import source_from_argv
+from frame_utils import crop_center_square
+from quantize import PaletteQuantizer
 
 class CameraApp:
     def __init__(self):
         pyxel.init(256, 256, title="USB Camera Cropped View")
 
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+        # 映像ソース（引数なし: check_cameras.py で保存したカメラ / synthetic / 動画 / *.raw）
+        self.cap = source_from_argv()
 
         # カメラ解像度取得と表示
         width  = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         print(f"🎥 カメラ解像度: {width} x {height}")
 
+        # 読み込みは別スレッドで行い、update では最新フレームだけを受け取る
+        self.cap = FrameGrabber(self.cap)
+
+        # 3D ルックアップキューブによる減色（Dキーでディザ切替）
+        self.quantizer = PaletteQuantizer(dither=True)
+
+        # 変化のないフレームは処理を省略し、変わった 16x16 タイルだけ書き込む
+        self.change_detector = FrameChangeDetector()
+        self.uploader = TileUploader(tile=16)
+
         pyxel.run(self.update, self.draw)
 
     def update(self):
+        if pyxel.btnp(pyxel.KEY_D):
+            self.quantizer.dither = not self.quantizer.dither
+            print(f"ディザ: {'ON' if self.quantizer.dither else 'OFF'}")
+
         ret, frame = self.cap.read()
         if not ret:
             return
 
+        # 映像もディザ設定も変わっていなければ前回の画像をそのまま表示
+        if not self.change_detector.changed(frame, key=self.quantizer.dither):
+            return
+
+        # 正方形に中央クロップ → 256x256 に縮小（BGRのまま）
+        img_cropped = crop_center_square(frame)
+        img = cv2.resize(img_cropped, (256, 256), interpolation=cv2.INTER_AREA)
+
         # BGR → RGB
-        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        #img = frame
-        h, w, _ = img.shape
-
-        # 正方形に中央クロップ
-        if w > h:
-            margin = (w - h) // 2
-            img_cropped = img[:, margin:margin + h]  # 横をカット
-        else:
-            margin = (h - w) // 2
-            img_cropped = img[margin:margin + w, :]  # 縦をカット
-
-        # Pillow Image に変換してリサイズ
-        img_pil = Image.fromarray(img_cropped).resize((256, 256))
-
-        # 一時ファイル保存
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            img_pil.save(tmp.name)
-            temp_path = tmp.name
-
-        pyxel.image(0).load(0, 0, temp_path)
-        os.remove(temp_path)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+        # パレットインデックスに変換し、変わったタイルだけイメージバンクへ書き込み
+        indices = self.quantizer.quantize(img)
+        self.uploader.upload(pyxel.image(0), indices)
 
     def draw(self):
         pyxel.cls(0)
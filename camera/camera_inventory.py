@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+# 調べた結果の保存先（カメラアプリは起動時にここを読む）
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "camera_inventory.json")
+
+# 問い合わせる解像度候補（実際に設定できた値を記録する）
+CANDIDATE_MODES = [(320, 240), (640, 480), (800, 600), (1280, 720), (1920, 1080)]
+
+
+def default_api():
+    return cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY  # Windows なら CAP_DSHOW 推奨
+
+
+class OpenCVBackend:
+    # cv2.VideoCapture で実デバイスを調べる
+    def __init__(self, api=None):
+        self.api = default_api() if api is None else api
+
+    def device_path(self, index):
+        if sys.platform.startswith("linux"):
+            return f"/dev/video{index}"
+        return f"camera:{index}"
+
+    def probe(self, index):
+        cap = cv2.VideoCapture(index, self.api)
+        try:
+            if cap is None or not cap.isOpened():
+                return None
+            modes = []
+            for width, height in CANDIDATE_MODES:
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+                mode = {
+                    "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                    "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                    "fps": round(cap.get(cv2.CAP_PROP_FPS), 2),
+                }
+                if mode not in modes:
+                    modes.append(mode)
+            return {"index": index, "path": self.device_path(index), "modes": modes}
+        finally:
+            if cap is not None:
+                cap.release()
+
+
+class FakeBackend:
+    # テスト用：{index: モード一覧} を返すだけ。hang に入れた番号は応答しない
+    def __init__(self, devices, hang=(), delay=0.0):
+        self.devices = devices
+        self.hang = set(hang)
+        self.delay = delay
+
+    def device_path(self, index):
+        return f"fake:{index}"
+
+    def probe(self, index):
+        if index in self.hang:
+            threading.Event().wait()
+        time.sleep(self.delay)
+        if index not in self.devices:
+            return None
+        return {"index": index, "path": self.device_path(index), "modes": list(self.devices[index])}
+
+
+def discover_cameras(backend=None, max_devices=10, timeout=3.0):
+    # 全番号を並列に調べ、timeout 秒以内に応答した使用可能なデバイスを返す
+    # 応答しないプローブはデーモンスレッドごと置き去りにする（終了を妨げない）
+    backend = backend or OpenCVBackend()
+    results = {}
+
+    def run(index):
+        try:
+            results[index] = backend.probe(index)
+        except Exception as e:  # 1 台の失敗で全体を止めない
+            print(f"⚠ カメラデバイス {index} の確認に失敗: {e}")
+            results[index] = None
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(max_devices)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + timeout
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+    devices = []
+    for i in range(max_devices):
+        if i not in results:
+            print(f"⌛ カメラデバイス {i} は応答がありません（{timeout} 秒でタイムアウト）")
+        elif results[i] is None:
+            print(f"❌ カメラデバイス {i} は使用できません")
+        else:
+            print(f"✅ カメラデバイス {i} が使用可能です")
+            devices.append(results[i])
+    return devices
+
+
+def save_inventory(devices, path=CACHE_PATH):
+    # デバイスパスをキーにして JSON に保存
+    data = {"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "devices": {d["path"]: d for d in devices}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def load_inventory(path=CACHE_PATH):
+    # 保存済みのデバイス一覧（なければ・壊れていれば空の dict）
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("devices", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def preferred_camera(path=CACHE_PATH, min_side=256):
+    # キャッシュから最初のデバイスと、短辺が min_side 以上で最小のモードを選ぶ（なければ None）
+    devices = sorted(load_inventory(path).values(), key=lambda d: d["index"])
+    if not devices:
+        return None
+    device = devices[0]
+    modes = [m for m in device["modes"] if min(m["width"], m["height"]) >= min_side] or device["modes"]
+    mode = min(modes, key=lambda m: m["width"] * m["height"]) if modes else None
+    return device["index"], mode
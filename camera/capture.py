@@ -0,0 +1,43 @@
+import threading
+import time
+
+
+class FrameGrabber:
+    # 別スレッドでカメラを読み続け、最新フレームだけを 1 枠に保持する
+    def __init__(self, cap):
+        self.cap = cap
+        self.dropped = 0  # 読まれずに上書きされたフレーム数
+        self._lock = threading.Lock()
+        self._frame = None
+        self._fresh = False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.005)  # デバイス未準備時の空回り防止
+                continue
+            with self._lock:
+                if self._fresh:
+                    self.dropped += 1
+                self._frame = frame
+                self._fresh = True
+
+    def read(self):
+        # cv2.VideoCapture.read() と同じ形：新しいフレームがなければ (False, None)
+        with self._lock:
+            if not self._fresh:
+                return False, None
+            self._fresh = False
+            return True, self._frame
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def release(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self.cap.release()
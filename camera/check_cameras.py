@@ -1,13 +1,13 @@
-import cv2
+from camera_inventory import CACHE_PATH, discover_cameras, save_inventory
 
-def list_cameras(max_devices=10):
+def list_cameras(max_devices=10, timeout=3.0):
+    # 全デバイスを並列に調べ、対応解像度・fps をキャッシュに保存（カメラアプリは起動時にこれを読む）
     print("📷 接続されているカメラをスキャン中...")
-    for i in range(max_devices):
-        cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)  # Windows なら CAP_DSHOW 推奨
-        if cap is not None and cap.isOpened():
-            print(f"✅ カメラデバイス {i} が使用可能です")
-            cap.release()
-        else:
-            print(f"❌ カメラデバイス {i} は使用できません")
+    devices = discover_cameras(max_devices=max_devices, timeout=timeout)
+    for device in devices:
+        modes = ", ".join(f"{m['width']}x{m['height']}@{m['fps']:g}" for m in device["modes"])
+        print(f"   {device['path']}: {modes}")
+    save_inventory(devices)
+    print(f"💾 保存しました: {CACHE_PATH}")
 
 list_cameras()
@@ -0,0 +1,70 @@
+import numpy as np
+from frame_utils import image_buffer
+
+
+class FrameChangeDetector:
+    # 間引いた画素を grid×grid のタイルに分け、どれかのタイルの平均差分が threshold を超えたら
+    # 「前回処理したフレームから変わった」とする（画面の一部だけが動いても見逃さない）
+    # key（解像度や角度など）が変わった時は常に変化ありとする
+    def __init__(self, step=8, threshold=3.0, grid=8):
+        self.step = step
+        self.threshold = threshold
+        self.grid = grid
+        self._sample = None
+        self._key = None
+
+    def changed(self, frame, key=None):
+        sample = frame[::self.step, ::self.step].astype(np.int16)
+        if self._sample is not None and key == self._key and sample.shape == self._sample.shape:
+            diff = np.abs(sample - self._sample)
+            if diff.ndim == 3:
+                diff = diff.mean(axis=2)
+            if not (tile_means(diff, self.grid) >= self.threshold).any():
+                return False
+        # 少しずつの変化も積み重なれば検出できるよう、比較元は処理したフレームだけ更新する
+        self._sample = sample
+        self._key = key
+        return True
+
+
+def tile_means(values, grid):
+    # (H, W) の配列を縦横 grid 個ずつ（割り切れなければほぼ等分）のタイルに分けた平均 (gy, gx)
+    h, w = values.shape
+    rows = np.linspace(0, h, min(grid, h) + 1).astype(np.intp)
+    cols = np.linspace(0, w, min(grid, w) + 1).astype(np.intp)
+    sums = np.add.reduceat(np.add.reduceat(values, rows[:-1], axis=0), cols[:-1], axis=1)
+    return sums / np.outer(np.diff(rows), np.diff(cols))
+
+
+class TileUploader:
+    # 前回書き込んだインデックス画像と比べ、変わった tile×tile のタイルだけイメージバンクへ書き込む
+    # （画像サイズは tile の倍数であること）
+    def __init__(self, tile=16, full_ratio=0.5):
+        self.tile = tile
+        self.full_ratio = full_ratio  # この割合以上のタイルが変わったら一括で書き込む
+        self._prev = None
+        self.last_dirty = 0
+
+    def upload(self, image, indices, x=0, y=0):
+        t = self.tile
+        h, w = indices.shape
+        buf = image_buffer(image)[y:y + h, x:x + w]
+        if self._prev is None or self._prev.shape != indices.shape:
+            buf[:] = indices
+            self._prev = indices.copy()
+            self.last_dirty = (h // t) * (w // t)
+            return self.last_dirty
+
+        changed = indices != self._prev
+        dirty = changed.reshape(h // t, t, w // t, t).any(axis=(1, 3))
+        ty, tx = np.nonzero(dirty)
+        self.last_dirty = len(ty)
+        if self.last_dirty >= dirty.size * self.full_ratio:
+            buf[:] = indices
+            self._prev[:] = indices
+        else:
+            for y0, x0 in zip(ty * t, tx * t):
+                tile = indices[y0:y0 + t, x0:x0 + t]
+                buf[y0:y0 + t, x0:x0 + t] = tile
+                self._prev[y0:y0 + t, x0:x0 + t] = tile
+        return self.last_dirty
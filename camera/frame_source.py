@@ -0,0 +1,132 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+from camera_inventory import default_api, preferred_camera
+from raw_video import RawReplaySource, RecordingSource
+
+
+class CameraSource:
+    # 実カメラ（cv2.VideoCapture そのまま）。width/height 指定時はそのモードを要求する
+    def __init__(self, index=0, api=None, width=None, height=None):
+        self.cap = cv2.VideoCapture(index, default_api() if api is None else api)
+        if width and height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        return self.cap.read()
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticSource:
+    # カメラなしで動く合成映像（パンする模様）。fps 指定時はその間隔で返す
+    def __init__(self, width=640, height=480, fps=None, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_index = 0
+        self._next_time = None
+
+        # 縦横 2 倍の模様を 1 回だけ作り、毎フレーム切り出し位置をずらす
+        ys, xs = np.mgrid[0:height * 2, 0:width * 2]
+        rings = ((np.hypot(xs - width, ys - height) // 24) % 2) * 160 + 48
+        world = np.stack([xs % 256, ys % 256, rings], axis=-1).astype(np.uint8)
+        noise = np.random.default_rng(seed).integers(0, 16, world.shape, dtype=np.uint8)
+        self._world = cv2.add(world, noise)
+
+    def read(self):
+        if self.fps:
+            now = time.perf_counter()
+            if self._next_time is not None and now < self._next_time:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time or now) + 1 / self.fps
+
+        t = self.frame_index
+        self.frame_index += 1
+        x = (t * 4) % self.width
+        y = (t * 2) % self.height
+        return True, self._world[y:y + self.height, x:x + self.width].copy()
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps or 0)
+        return 0.0
+
+    def release(self):
+        pass
+
+
+class VideoFileSource:
+    # 動画ファイルの再生（末尾で先頭に戻る）
+    def __init__(self, path, loop=True, realtime=False):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"動画ファイルを開けません: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.realtime = realtime  # True なら動画の fps で返す（False は全速。fps が分からない動画も全速）
+        self._next_time = None
+
+    def read(self):
+        if self.realtime and self.fps > 0:
+            now = time.perf_counter()
+            if self._next_time is not None and now < self._next_time:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time or now) + 1 / self.fps
+
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(spec=None, realtime=True):
+    # None → check_cameras.py が保存したカメラ一覧の先頭（なければカメラ0）
+    # "0" などの数字 → カメラ、"synthetic" → 合成映像、*.raw → 生フレームの再生、それ以外 → 動画ファイル
+    # realtime=False なら合成映像・生フレーム・動画ファイルを待ちなし（全速）で返す
+    if spec is None:
+        cached = preferred_camera()
+        if cached is None:
+            return CameraSource(0)
+        index, mode = cached
+        if mode is None:
+            return CameraSource(index)
+        return CameraSource(index, width=mode["width"], height=mode["height"])
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec == "synthetic":
+        return SyntheticSource(fps=30 if realtime else None)
+    if spec.endswith(".raw"):
+        return RawReplaySource(spec, realtime=realtime)
+    return VideoFileSource(spec, realtime=realtime)
+
+
+def source_from_argv(default=None):
+    # python camera.py [0 | synthetic | video.mp4 | session.raw] [--record session.raw]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default=default)
+    parser.add_argument("--record", help="読み込んだフレームを生フレームファイルに記録する")
+    args = parser.parse_args()
+    source = open_source(args.source)
+    if args.record:
+        source = RecordingSource(source, args.record)
+    return source
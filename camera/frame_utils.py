@@ -0,0 +1,46 @@
+import numpy as np
+import pyxel
+
+
+def crop_center_square(img):
+    # 正方形に中央クロップ（コピーせずビューを返す）
+    h, w = img.shape[:2]
+    if w > h:
+        margin = (w - h) // 2
+        return img[:, margin:margin + h]  # 横をカット
+    margin = (h - w) // 2
+    return img[margin:margin + w, :]  # 縦をカット
+
+
+def palette_rgb(colors=None):
+    # pyxel.colors (0xRRGGBB) → (N, 3) の RGB 配列
+    if colors is None:
+        colors = list(pyxel.colors)
+    colors = np.asarray(colors, dtype=np.uint32)
+    return np.stack([(colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF], axis=-1).astype(np.uint8)
+
+
+def rgb_to_palette_indices(rgb, palette):
+    # 最近傍色のインデックスに変換（|p - c|^2 = |p|^2 - 2p・c + |c|^2 の |p|^2 を省略）
+    pal = palette.astype(np.float32)
+    pixels = rgb.reshape(-1, 3).astype(np.float32)
+    score = (pal * pal).sum(axis=1) - 2.0 * (pixels @ pal.T)
+    return score.argmin(axis=1).astype(np.uint8).reshape(rgb.shape[:2])
+
+
+def image_buffer(image):
+    # イメージバンクの生データを (height, width) の uint8 配列として参照
+    return np.ctypeslib.as_array(image.data_ptr()).reshape(image.height, image.width)
+
+
+def upload_indices(image, indices, x=0, y=0):
+    # パレットインデックスをイメージバンクへ直接書き込む（PNG 経由なし）
+    h, w = indices.shape
+    image_buffer(image)[y:y + h, x:x + w] = indices
+
+
+def build_gray_lut(palette, gain=1.0):
+    # 輝度 0..255 → パレットインデックスの 256 要素テーブル（ゲイン込み）
+    levels = palette.astype(np.float32).mean(axis=1)
+    brightness = np.clip(np.rint(np.arange(256) * gain), 0, 255)
+    return np.abs(brightness[:, None] - levels[None, :]).argmin(axis=1).astype(np.uint8)
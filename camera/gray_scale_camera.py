@@ -1,77 +1,112 @@
+import time
 import pyxel
 import cv2
-import numpy as np
-from PIL import Image
-import tempfile
-import os
+from adaptive_resolution import ResolutionController
+from capture import FrameGrabber
+from dirty_tiles import FrameChangeDetector, TileUploader
+from frame_source import source_from_argv
+from frame_utils import build_gray_lut, crop_center_square, palette_rgb
+
+FPS = 60  # 保ちたいフレームレート
+BUDGET_SHARE = 0.75  # 1 フレームの時間のうち update+draw に使ってよい割合（残りは画面への転送など）
 
 class ResolutionEffectCameraApp:
     def __init__(self):
-        pyxel.init(256, 256, title="Virtual Resolution Toggle (Clean Sizes)")
+        pyxel.init(256, 256, title="Virtual Resolution Toggle (Clean Sizes)", fps=FPS)
 
         # Pyxelの16階調グレースケールパレット（白→黒）
         for i, gray in enumerate(reversed([int(j * 255 / 15) for j in range(16)])):
             pyxel.colors[i] = (gray << 16) | (gray << 8) | gray
 
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+        # 明るさ補正（×1.5）込みの 輝度→パレットインデックス 変換表
+        self.gray_lut = build_gray_lut(palette_rgb(), gain=1.5)
+
+        # 映像ソース（引数なし: check_cameras.py で保存したカメラ / synthetic / 動画 / *.raw）を別スレッドで読み、
+        # update では最新フレームだけを受け取る
+        self.cap = FrameGrabber(source_from_argv())
 
         # 解像度候補：きれいな16の倍数
         self.res_list = [24, 36, 48, 64, 72, 80, 96, 128, 160, 196, 224, 256]
         self.res_index = len(self.res_list) - 1  # 初期：256x256
 
+        # 自動解像度（Aキーで切替）：処理時間が予算を超えたら下げ、余裕があれば上げる
+        self.auto_res = False
+        self.res_controller = ResolutionController(budget_ms=1000 / FPS * BUDGET_SHARE)
+        self.update_ms = None  # 今フレームの update 処理時間（カメラ画像を処理した時だけ）
+
+        # 変化のないフレームは処理を省略し、変わった 16x16 タイルだけ書き込む
+        self.change_detector = FrameChangeDetector()
+        self.uploader = TileUploader(tile=16)
+
         pyxel.run(self.update, self.draw)
 
     def update(self):
-        # 解像度切り替え（↑：上げる、↓：下げる）
+        start = time.perf_counter()
+        processed = self.update_camera()
+        self.update_ms = (time.perf_counter() - start) * 1000 if processed else None
+
+    def update_camera(self):
+        # 自動解像度の切り替え
+        if pyxel.btnp(pyxel.KEY_A):
+            self.auto_res = not self.auto_res
+            print(f"🔁 自動解像度: {'ON' if self.auto_res else 'OFF'}")
+
+        # 解像度切り替え（↑：上げる、↓：下げる）※手動で変えたら自動はオフ
         if pyxel.btnp(pyxel.KEY_UP):
+            self.auto_res = False
             self.res_index = min(self.res_index + 1, len(self.res_list) - 1)
             print(f"⬆ 解像度: {self.res_list[self.res_index]}x{self.res_list[self.res_index]}")
         elif pyxel.btnp(pyxel.KEY_DOWN):
+            self.auto_res = False
             self.res_index = max(self.res_index - 1, 0)
             print(f"⬇ 解像度: {self.res_list[self.res_index]}x{self.res_list[self.res_index]}")
 
+        # Qで終了
+        if pyxel.btnp(pyxel.KEY_Q):
+            pyxel.quit()
+            cv2.destroyAllWindows()
+
+        # 新しいフレームがなければ前回の画像をそのまま表示
         ret, frame = self.cap.read()
         if not ret:
-            return
+            return False
 
-        # グレースケール化 + 明るさ補正
+        # グレースケール化（映像も解像度も変わっていなければ前回の画像をそのまま表示）
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.convertScaleAbs(gray, alpha=1.5)
+        target_res = self.res_list[self.res_index]
+        if not self.change_detector.changed(gray, key=target_res):
+            return False
 
         # 正方形にトリミング
-        h, w = gray.shape
-        if w > h:
-            margin = (w - h) // 2
-            square = gray[:, margin:margin + h]
-        else:
-            margin = (h - w) // 2
-            square = gray[margin:margin + w, :]
+        square = crop_center_square(gray)
 
         # ↓ここがポイント：選んだ解像度に縮小してから256×256に拡大
-        target_res = self.res_list[self.res_index]
-        img_pil = Image.fromarray(square).resize((target_res, target_res), resample=Image.BILINEAR)
-        img_pil = img_pil.resize((256, 256), resample=Image.NEAREST)  # 粗さを維持
+        small = cv2.resize(square, (target_res, target_res), interpolation=cv2.INTER_AREA)
 
-        # 減色（16色）＋ Pyxel用パレットに変換
-        img_p = img_pil.convert("P", palette=Image.ADAPTIVE, colors=16)
-        palette = [(int(i * 255 / 15),) * 3 for i in reversed(range(16))]
-        flat_palette = sum(palette, ()) + (0,) * (768 - 48)
-        img_p.putpalette(flat_palette)
+        # 変換表で一括減色（明るさ補正込み）→ 粗さを維持して拡大
+        indices = self.gray_lut[small]
+        indices = cv2.resize(indices, (256, 256), interpolation=cv2.INTER_NEAREST)
 
-        # 一時ファイル保存 → Pyxelに読み込み
-        temp_path = os.path.join(tempfile.gettempdir(), "debug_palette_image.png")
-        img_p.save(temp_path)
-        pyxel.image(0).load(0, 0, temp_path)
-
-        # Qで終了
-        if pyxel.btnp(pyxel.KEY_Q):
-            pyxel.quit()
-            cv2.destroyAllWindows()
+        # 変わったタイルだけイメージバンクへ書き込み
+        self.uploader.upload(pyxel.image(0), indices)
+        return True
 
     def draw(self):
+        start = time.perf_counter()
         pyxel.cls(0)
         pyxel.blt(0, 0, 0, 0, 0, 256, 256)
 
+        # カメラ画像を処理したフレームの update+draw 時間で解像度を調整
+        if self.update_ms is not None:
+            self.res_controller.record(self.update_ms + (time.perf_counter() - start) * 1000)
+            if self.auto_res:
+                avg = self.res_controller.average()
+                index = self.res_controller.adjust(self.res_index, len(self.res_list))
+                if index != self.res_index:
+                    self.res_index = index
+                    res = self.res_list[index]
+                    print(f"🔁 解像度: {res}x{res}（平均 {avg:.1f} ms）")
+
     def __del__(self):
         self.cap.release()
         cv2.destroyAllWindows()
@@ -1,9 +1,10 @@
 import pyxel
 import cv2
-import numpy as np
-from PIL import Image
-import tempfile
-import os
+from capture import FrameGrabber
+from dirty_tiles import FrameChangeDetector, TileUploader
+from frame_source import source_from_argv
+from frame_utils import build_gray_lut, palette_rgb
+from remap import RemapCache
 
 class RotatingResolutionCameraApp:
     def __init__(self):
@@ -13,7 +14,12 @@ class RotatingResolutionCameraApp:
         for i, gray in enumerate(reversed([int(j * 255 / 15) for j in range(16)])):
             pyxel.colors[i] = (gray << 16) | (gray << 8) | gray
 
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+        # 明るさ補正（×1.5）込みの 輝度→パレットインデックス 変換表
+        self.gray_lut = build_gray_lut(palette_rgb(), gain=1.5)
+
+        # 映像ソース（引数なし: check_cameras.py で保存したカメラ / synthetic / 動画 / *.raw）を別スレッドで読み、
+        # update では最新フレームだけを受け取る
+        self.cap = FrameGrabber(source_from_argv())
 
         # カスタム解像度リスト
         self.res_list = [24, 36, 48, 64, 72, 80, 96, 128, 160, 196, 224, 256]
@@ -21,6 +27,14 @@ class RotatingResolutionCameraApp:
 
         self.rotation_angle = 0.0  # 回転角度
 
+        # 縮小・回転・拡大をまとめたインデックス表のキャッシュ（角度×解像度）
+        self.remap = RemapCache(out_size=256, max_entries=64)
+
+        # 変化のないフレームは処理を省略し、変わった 16x16 タイルだけ書き込む
+        self.gray = None  # 最後に受け取ったフレーム（回転だけ変えた時に使い回す）
+        self.change_detector = FrameChangeDetector()
+        self.uploader = TileUploader(tile=16)
+
         pyxel.run(self.update, self.draw)
 
     def update(self):
@@ -36,43 +50,29 @@ class RotatingResolutionCameraApp:
         elif pyxel.btn(pyxel.KEY_RIGHT):
             self.rotation_angle = (self.rotation_angle - 2) % 360
 
-        # カメラ画像取得
+        # Qで終了
+        if pyxel.btnp(pyxel.KEY_Q):
+            pyxel.quit()
+            cv2.destroyAllWindows()
+
+        # カメラ画像取得 → グレースケール化（新しいフレームがなければ前回のものを使う）
         ret, frame = self.cap.read()
-        if not ret:
+        if ret:
+            self.gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.gray is None:
             return
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.convertScaleAbs(gray, alpha=1.5)
-
-        # 正方形にトリミング
-        h, w = gray.shape
-        if w > h:
-            margin = (w - h) // 2
-            square = gray[:, margin:margin + h]
-        else:
-            margin = (h - w) // 2
-            square = gray[margin:margin + w, :]
-
-        # PIL変換 → 解像度に縮小 → 回転 → 256×256に再拡大
+        # 映像も解像度・角度も変わっていなければ前回の画像をそのまま表示
         target_res = self.res_list[self.res_index]
-        img_pil = Image.fromarray(square).resize((target_res, target_res), resample=Image.BILINEAR)
-        img_pil = img_pil.rotate(self.rotation_angle, expand=False).resize((256, 256), resample=Image.NEAREST)
-
-        # 減色 + パレット適用
-        img_p = img_pil.convert("P", palette=Image.ADAPTIVE, colors=16)
-        palette = [(int(i * 255 / 15),) * 3 for i in reversed(range(16))]
-        flat_palette = sum(palette, ()) + (0,) * (768 - 48)
-        img_p.putpalette(flat_palette)
+        if not self.change_detector.changed(self.gray, key=(target_res, self.rotation_angle)):
+            return
 
-        # 一時ファイル経由でPyxelにロード
-        temp_path = os.path.join(tempfile.gettempdir(), "debug_palette_image.png")
-        img_p.save(temp_path)
-        pyxel.image(0).load(0, 0, temp_path)
+        # 中央クロップ → 解像度に縮小 → 回転 → 256×256に再拡大 を 1 回のギャザーで
+        img = self.remap.apply(self.gray, target_res, self.rotation_angle, fill=0)
 
-        # Qで終了
-        if pyxel.btnp(pyxel.KEY_Q):
-            pyxel.quit()
-            cv2.destroyAllWindows()
+        # 変換表で一括減色（明るさ補正込み）→ 変わったタイルだけイメージバンクへ書き込み
+        indices = self.gray_lut[img]
+        self.uploader.upload(pyxel.image(0), indices)
 
     def draw(self):
         pyxel.cls(0)
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pyxel
+from frame_utils import palette_rgb, rgb_to_palette_indices
+
+# 4x4 Bayer 行列（0..15）
+BAYER_4X4 = np.array([
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+])
+
+
+class PaletteQuantizer:
+    # RGB → pyxel.colors のインデックス変換を 3D ルックアップキューブで行う
+    def __init__(self, bits=5, dither=False, dither_strength=32):
+        self.bits = bits
+        self.dither = dither
+        self.dither_strength = dither_strength
+        self._colors = None
+        self._cube = None
+        self._bayer = None
+
+    def _rebuild_cube(self, colors):
+        # 各セル中心の最近傍色を前計算（32x32x32 なら 32768 セル）
+        size = 1 << self.bits
+        step = 256 // size
+        centers = np.arange(size, dtype=np.uint8) * step + step // 2
+        r, g, b = np.meshgrid(centers, centers, centers, indexing="ij")
+        grid = np.stack([r, g, b], axis=-1).reshape(-1, 1, 3)
+        self._cube = rgb_to_palette_indices(grid, palette_rgb(colors)).ravel()
+        self._colors = colors
+
+    def _bayer_offsets(self, h, w):
+        # フレームサイズ分に敷き詰めたディザのオフセット（サイズが変わった時だけ再生成）
+        # 符号付きの値を 加算分/減算分 の uint8 に分けて飽和演算で使う
+        if self._bayer is None or self._bayer[0].shape[:2] != (h, w):
+            threshold = (BAYER_4X4 + 0.5) / 16 - 0.5
+            tiled = np.tile(threshold, ((h + 3) // 4, (w + 3) // 4))[:h, :w]
+            offset = np.repeat(np.rint(tiled * self.dither_strength)[:, :, None], 3, axis=2)
+            self._bayer = (np.clip(offset, 0, 255).astype(np.uint8), np.clip(-offset, 0, 255).astype(np.uint8))
+        return self._bayer
+
+    def quantize(self, rgb):
+        # パレットが変わった時だけキューブを作り直す
+        colors = list(pyxel.colors)
+        if colors != self._colors:
+            self._rebuild_cube(colors)
+
+        if self.dither:
+            h, w = rgb.shape[:2]
+            plus, minus = self._bayer_offsets(h, w)
+            rgb = cv2.subtract(cv2.add(rgb, plus), minus)
+
+        shift = 8 - self.bits
+        q = (rgb >> shift).astype(np.uint16)
+        index = (q[:, :, 0] << (2 * self.bits)) | (q[:, :, 1] << self.bits) | q[:, :, 2]
+        return self._cube[index]
@@ -0,0 +1,121 @@
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+# 生フレームファイル: 32 バイトのヘッダ + 固定長フレーム（uint8, height×width×channels）の連続
+MAGIC = b"PYXRAW1\0"
+HEADER = struct.Struct("<8sIIIf")  # magic, width, height, channels, fps
+HEADER_SIZE = 32
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, width, height, channels, fps = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"生フレームファイルではありません: {path}")
+    return width, height, channels, fps
+
+
+class FrameRecorder:
+    # 受け取ったフレームをそのまま追記する（エンコードなし）
+    def __init__(self, path, width, height, channels=3, fps=30.0):
+        self.path = path
+        self.shape = (height, width, channels) if channels > 1 else (height, width)
+        self.frame_count = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, width, height, channels, fps).ljust(HEADER_SIZE, b"\0"))
+
+    def write(self, frame):
+        if frame.shape != self.shape or frame.dtype != np.uint8:
+            raise ValueError(f"フレームの形が違います: {frame.shape} {frame.dtype}（期待値 {self.shape} uint8）")
+        self._file.write(np.ascontiguousarray(frame).data)
+        self.frame_count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class RecordingSource:
+    # 映像ソースを包み、読んだフレームを記録しながらそのまま返す
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+        self.recorder = None
+
+    def read(self):
+        ret, frame = self.source.read()
+        if ret:
+            if self.recorder is None:
+                # 最初のフレームでサイズが決まる
+                h, w = frame.shape[:2]
+                channels = frame.shape[2] if frame.ndim == 3 else 1
+                fps = self.source.get(cv2.CAP_PROP_FPS) or 30.0
+                self.recorder = FrameRecorder(self.path, w, h, channels, fps)
+            self.recorder.write(frame)
+        return ret, frame
+
+    def get(self, prop_id):
+        return self.source.get(prop_id)
+
+    def release(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"💾 {self.recorder.frame_count} フレームを記録: {self.path}")
+        self.source.release()
+
+
+class RawReplaySource:
+    # 生フレームファイルを np.memmap で開き、カメラと同じ read() で返す
+    # 返すフレームはファイルへのビュー（コピーなし・読み取り専用）
+    def __init__(self, path, loop=True, realtime=False):
+        width, height, channels, self.fps = read_header(path)
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        stride = int(np.prod(shape))
+        count = (os.path.getsize(path) - HEADER_SIZE) // stride
+        self.frames = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=(count, *shape))
+        self.loop = loop
+        self.realtime = realtime  # True なら記録時の fps で返す（False は全速）
+        self.position = 0
+        self._next_time = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def seek(self, index):
+        self.position = max(0, min(index, len(self.frames)))
+
+    def read(self):
+        if self.position >= len(self.frames):
+            if not self.loop or len(self.frames) == 0:
+                return False, None
+            self.position = 0
+
+        if self.realtime and self.fps > 0:
+            now = time.perf_counter()
+            if self._next_time is not None and now < self._next_time:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time or now) + 1 / self.fps
+
+        frame = self.frames[self.position]
+        self.position += 1
+        return True, frame
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.frames.shape[2])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.frames.shape[1])
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.frames))
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        return 0.0
+
+    def release(self):
+        # memmap への参照を手放す（ファイルは最後のビューが消えた時に閉じられる）
+        self.frames = np.empty((0, *self.frames.shape[1:]), dtype=np.uint8)
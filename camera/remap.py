@@ -0,0 +1,64 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+
+def build_remap(src_shape, res, angle, out_size=256):
+    # 中央クロップ → res×res に縮小 → angle 度回転 → out_size に最近傍拡大
+    # を 1 回のギャザーにまとめたインデックス表を作る（PIL の rotate と同じ向き）
+    h, w = src_shape[:2]
+    side = min(h, w)
+    off_y = (h - side) // 2
+    off_x = (w - side) // 2
+
+    # 出力画素 → 縮小画像の画素中心
+    coords = (np.arange(out_size) + 0.5) * res / out_size
+    low = np.floor(coords) + 0.5
+    lx, ly = np.meshgrid(low, low)
+
+    # 回転の逆変換（反時計回り angle 度の画像を作るための参照元）
+    theta = math.radians(angle)
+    cos_t = math.cos(theta)
+    sin_t = math.sin(theta)
+    center = res / 2
+    rx = cos_t * (lx - center) - sin_t * (ly - center) + center
+    ry = sin_t * (lx - center) + cos_t * (ly - center) + center
+    ix = np.floor(rx).astype(np.int64)
+    iy = np.floor(ry).astype(np.int64)
+    valid = (ix >= 0) & (ix < res) & (iy >= 0) & (iy < res)
+
+    # 縮小画像の画素 → 元フレームの画素
+    sx = ((np.clip(ix, 0, res - 1) + 0.5) * side / res).astype(np.int64) + off_x
+    sy = ((np.clip(iy, 0, res - 1) + 0.5) * side / res).astype(np.int64) + off_y
+    index = (sy * w + sx).astype(np.int32)
+    outside = np.flatnonzero(~valid).astype(np.int32)
+    return index, outside
+
+
+class RemapCache:
+    # (フレームサイズ, 解像度, 角度) ごとのインデックス表を LRU で保持する
+    def __init__(self, out_size=256, max_entries=32):
+        self.out_size = out_size
+        self.max_entries = max_entries
+        self._tables = OrderedDict()
+
+    def get(self, src_shape, res, angle):
+        key = (src_shape[:2], res, round(angle % 360, 3))
+        table = self._tables.get(key)
+        if table is None:
+            table = build_remap(src_shape, res, key[2], self.out_size)
+            self._tables[key] = table
+            if len(self._tables) > self.max_entries:
+                self._tables.popitem(last=False)
+        else:
+            self._tables.move_to_end(key)
+        return table
+
+    def apply(self, src, res, angle, fill=0):
+        # 1 回のギャザーで変換し、回転で外にはみ出した所は fill で埋める
+        index, outside = self.get(src.shape, res, angle)
+        out = src.reshape(-1, *src.shape[2:])[index]
+        if outside.size:
+            out.reshape(-1, *src.shape[2:])[outside] = fill
+        return out
@@ -1,5 +1,18 @@
+import os
+import sys
 import pyxel
 import math
+import numpy as np
+from projectile_swarm import ProjectileSwarm
+
+# 固定タイムステップは physics/ のものを共用する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "physics"))
+from fixed_timestep import FixedTimestep, lerp
+
+PHYSICS_HZ = 120  # 物理の更新頻度（描画とは独立）
+SPEED_SCALE = 0.1  # 発射速度 → 1 ステップ(dt=1)あたりの移動量
+SWARM_CAPACITY = 20000  # 大量発射モードの最大弾数
+SWARM_BURST = 500  # Fキー 1 フレームあたりの発射数
 
 class App:
     def __init__(self):
@@ -8,6 +21,13 @@ class App:
         self.gravity_on = False  # 重力の初期状態はオフ
         self.gravity = 0.1  # 重力加速度
         self.scale_factor = 0.5  # スケールを50%に設定
+
+        # 大量発射モード（Mキーで切替）：画面外に出た弾は同じフレームで再発射する
+        self.swarm_mode = False
+        self.swarm = ProjectileSwarm(SWARM_CAPACITY, pyxel.width, pyxel.height,
+                                     gravity=self.gravity, speed_scale=SPEED_SCALE)
+
+        self.timestep = FixedTimestep(hz=PHYSICS_HZ)
         pyxel.run(self.update, self.draw)
 
     def reset(self):
@@ -18,9 +38,20 @@ class App:
         self.launched = False
         self.vx = 0
         self.vy = 0
+        self.prev_x, self.prev_y = self.ball_x, self.ball_y  # 描画補間用の1ステップ前の位置
 
     def update(self):
-        if not self.launched:
+        # 実時間に合わせて回す物理ステップ数（毎フレーム数えて時間を貯めておく）
+        steps = self.timestep.advance()
+
+        if pyxel.btnp(pyxel.KEY_M):
+            self.swarm_mode = not self.swarm_mode
+            self.swarm.alive[:] = False
+            self.reset()
+
+        if self.swarm_mode:
+            self.update_swarm(steps)
+        elif not self.launched:
             # 角度調整（左: +、右: -）
             if pyxel.btn(pyxel.KEY_LEFT):
                 self.angle_deg = min(180, self.angle_deg + 1)
@@ -38,28 +69,60 @@ class App:
                 self.vy = -self.speed * math.sin(rad)
                 self.launched = True
         else:
-            # 重力がオンの場合、Y軸に加速度を加える
-            if self.gravity_on:
-                self.vy += self.gravity
-
-            # 無重力で直線移動
-            self.ball_x += self.vx * 0.1
-            self.ball_y += self.vy * 0.1
-
-            # 画面外に出た場合、ボールを再装填
-            if (self.ball_x < 0 or self.ball_x > pyxel.width or
-                self.ball_y < 0 or self.ball_y > pyxel.height):
-                self.reset()
+            for _ in range(steps):
+                if not self.step(self.timestep.dt):
+                    break
 
         # Gキーで重力のオン/オフを切り替え
         if pyxel.btnp(pyxel.KEY_G):
             self.gravity_on = not self.gravity_on
 
+    def step(self, dt):
+        self.prev_x, self.prev_y = self.ball_x, self.ball_y
+
+        # 重力がオンの場合、Y軸に加速度を加える
+        if self.gravity_on:
+            self.vy += self.gravity * dt
+
+        # 無重力で直線移動
+        self.ball_x += self.vx * SPEED_SCALE * dt
+        self.ball_y += self.vy * SPEED_SCALE * dt
+
+        # 画面外に出た場合、ボールを再装填
+        if (self.ball_x < 0 or self.ball_x > pyxel.width or
+            self.ball_y < 0 or self.ball_y > pyxel.height):
+            self.reset()
+            return False
+        return True
+
+    def update_swarm(self, steps):
+        # 角度・速度の調整は通常モードと同じ
+        if pyxel.btn(pyxel.KEY_LEFT):
+            self.angle_deg = min(180, self.angle_deg + 1)
+        if pyxel.btn(pyxel.KEY_RIGHT):
+            self.angle_deg = max(0, self.angle_deg - 1)
+        if pyxel.btn(pyxel.KEY_DOWN):
+            self.speed = max(0, self.speed - 1)
+        if pyxel.btn(pyxel.KEY_UP):
+            self.speed = min(100, self.speed + 1)
+
+        # 積分・画面外の消去・再発射をそれぞれ全弾まとめて 1 回
+        culled = 0
+        for _ in range(steps):
+            culled += self.swarm.update(self.timestep.dt)
+        count = culled + (SWARM_BURST if pyxel.btn(pyxel.KEY_F) else 0)
+        self.swarm.fire(count, self.ball_x, self.ball_y, self.angle_deg, self.speed, self.gravity_on)
+
     def draw(self):
         pyxel.cls(0)
 
-        # ボール
-        pyxel.circ(self.ball_x, self.ball_y, 3, 8)
+        if self.swarm_mode:
+            self.draw_swarm()
+            return
+
+        # ボール（物理ステップ間を補間して描く）
+        alpha = self.timestep.alpha if self.launched else 1.0
+        pyxel.circ(lerp(self.prev_x, self.ball_x, alpha), lerp(self.prev_y, self.ball_y, alpha), 3, 8)
 
         # 矢印
         if not self.launched:
@@ -87,4 +150,24 @@ class App:
         vtotal = math.sqrt(self.vx**2 + self.vy**2)
         pyxel.text(5, 65, f"vtotal: {vtotal:.2f}", 7)
 
+    def draw_swarm(self):
+        # 弾はイメージバンク0に一括で描き込んで 1 回の blt で表示
+        image = pyxel.image(0)
+        buffer = np.ctypeslib.as_array(image.data_ptr()).reshape(image.height, image.width)
+        buffer[:pyxel.height, :pyxel.width] = 0
+        self.swarm.draw(buffer, 8)
+        pyxel.blt(0, 0, 0, 0, 0, pyxel.width, pyxel.height, 0)
+
+        # 発射台の矢印
+        rad = math.radians(self.angle_deg)
+        end_x = self.ball_x + 20 * math.cos(rad)
+        end_y = self.ball_y - 20 * math.sin(rad)
+        pyxel.line(self.ball_x, self.ball_y, end_x, end_y, 11)
+
+        pyxel.text(5, 5, f"Angle: {self.angle_deg} deg", 7)
+        pyxel.text(5, 15, f"Speed: {self.speed}", 7)
+        pyxel.text(5, 25, "Hold F to fire  M: single mode", 6)
+        pyxel.text(5, 35, f"Gravity: {'ON' if self.gravity_on else 'OFF'}", 7)
+        pyxel.text(5, 45, f"Projectiles: {self.swarm.count}", 7)
+
 App()
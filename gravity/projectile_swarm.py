@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class ProjectileSwarm:
+    # 大量の弾を NumPy 配列でまとめて発射・移動・消去する
+    # （位置・速度・重力フラグ・生存マスクを 1 本ずつの配列で持つ）
+    def __init__(self, capacity, width, height, gravity=0.1, speed_scale=0.1, seed=0):
+        self.width = width
+        self.height = height
+        self.gravity = gravity
+        self.speed_scale = speed_scale
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.gravity_on = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def count(self):
+        return int(np.count_nonzero(self.alive))
+
+    def fire(self, count, x, y, angle_deg, speed, gravity_on, spread_deg=10.0, speed_jitter=0.2):
+        # 空いている枠に count 発をまとめて装填（角度・速度は少しばらつかせる）
+        slots = np.flatnonzero(~self.alive)[:count]
+        n = len(slots)
+        if n == 0:
+            return 0
+        angle = np.radians(angle_deg + self.rng.uniform(-spread_deg, spread_deg, n))
+        v = speed * (1 + self.rng.uniform(-speed_jitter, speed_jitter, n))
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = v * np.cos(angle)
+        self.vy[slots] = -v * np.sin(angle)
+        self.gravity_on[slots] = gravity_on
+        self.alive[slots] = True
+        return n
+
+    def update(self, dt=1.0):
+        # 重力 → 移動 → 画面外の弾を消す を全弾まとめて 1 回ずつ
+        self.vy += (self.gravity * dt) * (self.gravity_on & self.alive)
+        self.x += self.vx * (self.speed_scale * dt)
+        self.y += self.vy * (self.speed_scale * dt)
+        out = (self.x < 0) | (self.x > self.width) | (self.y < 0) | (self.y > self.height)
+        culled = int(np.count_nonzero(out & self.alive))
+        self.alive &= ~out
+        return culled
+
+    def draw(self, buffer, color):
+        # (height, width) の uint8 配列に生存している弾を 1 画素ずつ描き込む
+        xs = self.x[self.alive].astype(np.int32)
+        ys = self.y[self.alive].astype(np.int32)
+        inside = (xs >= 0) & (xs < buffer.shape[1]) & (ys >= 0) & (ys < buffer.shape[0])
+        buffer[ys[inside], xs[inside]] = color
@@ -0,0 +1,177 @@
+"""物理デモのヘッドレス・ベンチマーク
+
+ウィンドウを開かずに各デモの物理ステップだけを全速で回し、1 秒あたりのステップ数と
+処理段ごとの時間（各デモの PHASES）を計測する。最後の状態のハッシュも出すので、同じ環境なら毎回同じ値になるかを確かめられる。
+
+    python bench_headless.py                         # 全部のデモを既定のステップ数だけ回す
+    python bench_headless.py --steps 2000 --bodies 200 --gravity
+    python bench_headless.py --check                 # 2 回回して結果が一致するか確かめる
+    python bench_headless.py --rewind                # 途中の状態に巻き戻して回し直し、結果が一致するか確かめる
+    python bench_headless.py --scene reflect --gravity --sleep 400   # 400 ステップ以内に全部の箱が眠るか確かめる
+    python bench_headless.py --json result.json      # 結果を JSON で保存
+    python bench_headless.py --scene reflect --trace trace.csv   # ステップごとの処理段の時間を CSV で保存
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+
+import collision_circle_to_cube
+import collision_circle_to_level
+import collision_to_floor
+import obb_vs_obb_reflect
+import obb_world
+from fixed_timestep import FixedTimestep
+from profiler import PhaseProfiler
+
+SCENES = ["reflect", "circle_to_cube", "level", "floor"]
+# シーン名 → 処理段の名前（Simulation の timings に直近のステップの処理段ごとの時間 [ns] が入る）
+SCENE_PHASES = {"reflect": obb_world.PHASES, "circle_to_cube": collision_circle_to_cube.PHASES,
+                "level": collision_circle_to_level.PHASES, "floor": collision_to_floor.PHASES}
+
+
+def make_scene(name, bodies, gravity, seed):
+    # シーン名 → (Simulation, 1 ステップ進める関数, dt)
+    if name == "reflect":
+        sim = obb_vs_obb_reflect.Simulation(seed)
+        sim.spawn(bodies)
+        if gravity:
+            sim.toggle_gravity()
+        return sim, sim.simulate, FixedTimestep(hz=obb_vs_obb_reflect.PHYSICS_HZ).dt
+    if name == "circle_to_cube":
+        sim = collision_circle_to_cube.Simulation()
+        return sim, sim.step, FixedTimestep(hz=collision_circle_to_cube.PHYSICS_HZ).dt
+    if name == "level":
+        sim = collision_circle_to_level.Simulation(seed)
+        sim.spawn(bodies)
+        return sim, sim.step, FixedTimestep(hz=collision_circle_to_level.PHYSICS_HZ).dt
+    sim = collision_to_floor.Simulation()
+    return sim, sim.step, FixedTimestep(hz=collision_to_floor.PHYSICS_HZ).dt
+
+
+def state_digest(sim):
+    values = sim.state()
+    return hashlib.sha256(struct.pack(f"<{len(values)}d", *values)).hexdigest()[:16]
+
+
+def run_scene(name, steps, bodies, gravity, seed, profiler=None):
+    # steps 回進めて、全体の時間・処理段ごとの合計時間 [ns]・最後の状態のハッシュを返す
+    # profiler を渡すと、1 ステップを 1 フレームとして処理段の時間を記録する
+    sim, step, dt = make_scene(name, bodies, gravity, seed)
+    phases = dict.fromkeys(SCENE_PHASES[name], 0)
+    clock = time.perf_counter_ns
+    start = clock()
+    for _ in range(steps):
+        step(dt)
+        for phase, ns in sim.timings.items():
+            phases[phase] += ns
+        if profiler is not None:
+            profiler.add(sim.timings)
+            profiler.end_frame()
+    elapsed = clock() - start
+    return elapsed, phases, state_digest(sim)
+
+
+def rewind_scene(name, steps, bodies, gravity, seed):
+    # 半分進めたところの状態を取って残りを進め、取った状態に戻して同じだけ進め直す
+    # → (状態を取る時間 [ns], 戻す時間 [ns], 1 回目の最後の状態のハッシュ, 2 回目のハッシュ)
+    sim, step, dt = make_scene(name, bodies, gravity, seed)
+    for _ in range(steps // 2):
+        step(dt)
+    clock = time.perf_counter_ns
+    start = clock()
+    snapshot = sim.snapshot()
+    captured = clock() - start
+    for _ in range(steps - steps // 2):
+        step(dt)
+    first = state_digest(sim)
+
+    start = clock()
+    sim.restore(snapshot)
+    restored = clock() - start
+    for _ in range(steps - steps // 2):
+        step(dt)
+    return captured, restored, first, state_digest(sim)
+
+
+def sleep_scene(name, steps, bodies, gravity, seed):
+    # 全部の動く物体が眠るまで最大 steps 回進める → (眠った物体の数, 動く物体の数, 全部眠ったステップ数（眠らなければ None）)
+    sim, step, dt = make_scene(name, bodies, gravity, seed)
+    world = sim.world
+    dynamic = sum(1 for body in world.bodies if body.inv_mass)
+    for k in range(1, steps + 1):
+        step(dt)
+        if world.sleeping_count == dynamic:
+            return world.sleeping_count, dynamic, k
+    return world.sleeping_count, dynamic, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="物理デモのヘッドレス・ベンチマーク")
+    parser.add_argument("--scene", choices=SCENES, action="append", help="回すシーン（省略時は全部）")
+    parser.add_argument("--steps", type=int, default=1000, help="シーンごとのステップ数")
+    parser.add_argument("--bodies", type=int, default=100, help="reflect で最初に追加する小さな箱・level で追加するボールの数")
+    parser.add_argument("--gravity", action="store_true", help="reflect で重力をかける")
+    parser.add_argument("--seed", type=int, default=0, help="reflect の箱・level の地形とボールの配置の乱数")
+    parser.add_argument("--check", action="store_true", help="2 回回して最後の状態が一致するか確かめる")
+    parser.add_argument("--rewind", action="store_true", help="途中に巻き戻して回し直した結果が一致するか確かめる")
+    parser.add_argument("--sleep", type=int, metavar="STEPS",
+                        help="reflect で STEPS ステップ以内に全部の箱が眠るか確かめる（眠らなければ終了コード 1）")
+    parser.add_argument("--json", help="結果の保存先（JSON）")
+    parser.add_argument("--trace", help="ステップごとの処理段の時間の保存先（CSV）。シーンが複数ならシーン名を付ける")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    scenes = args.scene or SCENES
+    print(f"{'scene':<16}{'steps/s':>10}{'ms/step':>10}  digest            phases [us/step]")
+    for name in scenes:
+        profiler = None
+        if args.trace:
+            root, ext = os.path.splitext(args.trace)
+            profiler = PhaseProfiler(SCENE_PHASES[name])
+            profiler.start_trace(args.trace if len(scenes) == 1 else f"{root}_{name}{ext or '.csv'}")
+        elapsed, phases, digest = run_scene(name, args.steps, args.bodies, args.gravity, args.seed, profiler)
+        if profiler is not None:
+            profiler.stop_trace()
+        ms_per_step = elapsed / args.steps / 1e6
+        phase_ms = {phase: ns / args.steps / 1e6 for phase, ns in phases.items()}
+        row = "  ".join(f"{phase} {ms * 1000:.1f}" for phase, ms in phase_ms.items())
+        print(f"{name:<16}{args.steps / (elapsed / 1e9):10.0f}{ms_per_step:10.3f}  {digest}  {row}")
+        results[name] = {"steps_per_second": args.steps / (elapsed / 1e9), "ms_per_step": ms_per_step,
+                         "phases_ms": phase_ms, "digest": digest}
+
+        if args.check:
+            again = run_scene(name, args.steps, args.bodies, args.gravity, args.seed)[2]
+            results[name]["deterministic"] = again == digest
+            print(f"{'':<16}{'same' if again == digest else 'DIFFERENT: ' + again}")
+
+        if args.rewind:
+            captured, restored, first, again = rewind_scene(name, args.steps, args.bodies, args.gravity, args.seed)
+            results[name]["rewind"] = {"snapshot_ms": captured / 1e6, "restore_ms": restored / 1e6,
+                                       "deterministic": again == first}
+            print(f"{'':<16}rewind: snapshot {captured / 1e6:.3f} ms, restore {restored / 1e6:.3f} ms, "
+                  f"{'same' if again == first else 'DIFFERENT: ' + first + ' / ' + again}")
+
+        if args.sleep and name == "reflect":
+            sleeping, dynamic, settled = sleep_scene(name, args.sleep, args.bodies, args.gravity, args.seed)
+            results[name]["sleep"] = {"sleeping": sleeping, "bodies": dynamic, "settled_step": settled}
+            if settled is None:
+                failed = True
+                print(f"{'':<16}sleep: AWAKE {dynamic - sleeping}/{dynamic} after {args.sleep} steps")
+            else:
+                print(f"{'':<16}sleep: all {dynamic} asleep at step {settled}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"steps": args.steps, "bodies": args.bodies, "gravity": args.gravity, "seed": args.seed,
+                       "results": results}, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
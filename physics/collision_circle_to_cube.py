@@ -1,49 +1,24 @@
 import pyxel
 import math
+import time
+import numpy as np
+from fixed_timestep import FixedTimestep, lerp
+from geometry import obb_vertices, obb_edges, reflect_velocities
+from snapshot import SnapshotRing
+from static_bvh import StaticBVH
 
 WIDTH = 160
 HEIGHT = 120
 GRAVITY = 0.3
+PHYSICS_HZ = 120  # 物理の更新頻度（描画とは独立）
+PHASES = ("integrate", "collide", "respond")  # step の処理段（timings のキー）
 
-def get_obb_vertices(cx, cy, w, h, angle_deg):
-    angle = math.radians(angle_deg)
-    cos_a = math.cos(angle)
-    sin_a = math.sin(angle)
-    dx = w / 2
-    dy = h / 2
-    corners = [(-dx, -dy), (dx, -dy), (dx, dy), (-dx, dy)]
-    return [
-        (
-            cx + x * cos_a - y * sin_a,
-            cy + x * sin_a + y * cos_a
-        )
-        for (x, y) in corners
-    ]
-
-def point_to_segment_distance(px, py, x1, y1, x2, y2):
-    dx = x2 - x1
-    dy = y2 - y1
-    if dx == dy == 0:
-        return math.hypot(px - x1, py - y1), x1, y1
-    t = ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)
-    t = max(0, min(1, t))
-    nearest_x = x1 + t * dx
-    nearest_y = y1 + t * dy
-    distance = math.hypot(px - nearest_x, py - nearest_y)
-    return distance, nearest_x, nearest_y
-
-def reflect_velocity(vx, vy, nx, ny):
-    # 法線ベクトル(nx, ny)に沿って反射する
-    dot = vx * nx + vy * ny
-    rx = vx - 2 * dot * nx
-    ry = vy - 2 * dot * ny
-    return rx, ry
-
-class App:
+class Simulation:
+    # ボールと斜めの板の状態・物理ステップ（pyxel を使わないので、ウィンドウなしでも回せる）
     def __init__(self):
-        pyxel.init(WIDTH, HEIGHT, title="Circle vs OBB")
         self.ball_x = 80
         self.ball_y = 0
+        self.prev_x, self.prev_y = self.ball_x, self.ball_y  # 描画補間用の1ステップ前の位置
         self.vx = 0.5
         self.vy = 0
         self.radius = 5
@@ -54,50 +29,71 @@ class App:
         self.obb_w = 60
         self.obb_h = 10
         self.obb_angle = 30  # degrees
+        # OBB は動かないので頂点・辺は最初に 1 回だけ求め、辺を静的な地形（BVH）にしておく
+        self.obb_verts = obb_vertices(self.obb_cx, self.obb_cy, self.obb_w, self.obb_h, math.radians(self.obb_angle))
+        self.obb_starts, self.obb_ends = obb_edges(self.obb_verts)
+        self.level = StaticBVH(self.obb_starts, self.obb_ends)
+        self.timings = dict.fromkeys(PHASES, 0)  # 直近のステップの処理段ごとの時間 [ns]
 
-        pyxel.run(self.update, self.draw)
+    def step(self, dt):
+        clock = time.perf_counter_ns
+        t0 = clock()
+        self.prev_x, self.prev_y = self.ball_x, self.ball_y
 
-    def update(self):
-        self.vy += GRAVITY
-        self.ball_x += self.vx
-        self.ball_y += self.vy
+        self.vy += GRAVITY * dt
+        self.ball_x += self.vx * dt
+        self.ball_y += self.vy * dt
+        t1 = clock()
 
-        # OBBの各辺とボールの最短距離を調べて衝突判定
-        vertices = get_obb_vertices(self.obb_cx, self.obb_cy, self.obb_w, self.obb_h, self.obb_angle)
-        for i in range(4):
-            x1, y1 = vertices[i]
-            x2, y2 = vertices[(i + 1) % 4]
-            dist, nx, ny = point_to_segment_distance(self.ball_x, self.ball_y, x1, y1, x2, y2)
+        # 半径以内で一番近い辺を探して衝突判定（最近点からボールへの向きで反射して外へ出す）
+        hit = self.level.closest(self.ball_x, self.ball_y, self.radius)
+        t2 = clock()
+        if hit is not None:
+            _, dist, (px, py) = hit
+            # 中心がちょうど辺の上にある時は向きが決まらないので飛ばす
+            if dist > 0:
+                n = np.array([self.ball_x - px, self.ball_y - py]) / dist
+                if self.vx * n[0] + self.vy * n[1] < 0:
+                    self.vx, self.vy = reflect_velocities(np.array([self.vx, self.vy]), n).tolist()
+                self.ball_x = px + n[0] * self.radius
+                self.ball_y = py + n[1] * self.radius
+        self.timings = {"integrate": t1 - t0, "collide": t2 - t1, "respond": clock() - t2}
 
-            if dist < self.radius:
-                # 法線ベクトル（辺の垂直方向）
-                dx = x2 - x1
-                dy = y2 - y1
-                edge_len = math.hypot(dx, dy)
-                if edge_len == 0:
-                    continue
-                nxn = -dy / edge_len
-                nyn = dx / edge_len
+    def snapshot(self):
+        return np.array([self.ball_x, self.ball_y, self.prev_x, self.prev_y, self.vx, self.vy], dtype=np.float64)
 
-                # 反射処理
-                self.vx, self.vy = reflect_velocity(self.vx, self.vy, nxn, nyn)
+    def restore(self, snapshot):
+        self.ball_x, self.ball_y, self.prev_x, self.prev_y, self.vx, self.vy = snapshot.tolist()
 
-                # 接触点の外側にボールを出す
-                overlap = self.radius - dist
-                self.ball_x += nxn * overlap
-                self.ball_y += nyn * overlap
-                break
+    def state(self):
+        return [self.ball_x, self.ball_y, self.vx, self.vy]
+
+class App:
+    def __init__(self):
+        pyxel.init(WIDTH, HEIGHT, title="Circle vs OBB")
+        self.sim = Simulation()
+        self.timestep = FixedTimestep(hz=PHYSICS_HZ)
+        self.history = SnapshotRing()
+        pyxel.run(self.update, self.draw)
+
+    def update(self):
+        # R を押している間は 1 フレームずつ巻き戻す
+        steps = self.history.advance(self.sim, self.timestep, rewind=pyxel.btn(pyxel.KEY_R))
+        if steps is None:
+            return
+        for _ in range(steps):
+            self.sim.step(self.timestep.dt)
 
     def draw(self):
         pyxel.cls(0)
-        # ボール
-        pyxel.circ(self.ball_x, self.ball_y, self.radius, 10)
+        # ボール（物理ステップ間を補間して描く）
+        sim = self.sim
+        alpha = self.timestep.alpha
+        pyxel.circ(lerp(sim.prev_x, sim.ball_x, alpha), lerp(sim.prev_y, sim.ball_y, alpha), sim.radius, 10)
 
         # OBB（斜めの板）
-        vertices = get_obb_vertices(self.obb_cx, self.obb_cy, self.obb_w, self.obb_h, self.obb_angle)
-        for i in range(4):
-            x1, y1 = vertices[i]
-            x2, y2 = vertices[(i + 1) % 4]
+        for (x1, y1), (x2, y2) in zip(sim.obb_starts, sim.obb_ends):
             pyxel.line(int(x1), int(y1), int(x2), int(y2), 11)
 
-App()
+if __name__ == "__main__":
+    App()
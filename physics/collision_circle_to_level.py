@@ -0,0 +1,142 @@
+import pyxel
+import math
+import random
+import time
+import numpy as np
+from fixed_timestep import FixedTimestep, lerp
+from snapshot import SnapshotRing
+from static_bvh import StaticBVH
+
+WIDTH = 256
+HEIGHT = 256
+GRAVITY = 0.3
+PHYSICS_HZ = 60  # 物理の更新頻度（描画とは独立）
+RADIUS = 2
+RESTITUTION = 0.8
+OBSTACLES = 400  # 散らばった小さな多角形の数（辺は 3〜8 倍）
+MAX_BOUNCES = 3  # 1 ステップの中で続けて跳ね返る回数の上限
+SPAWN_COUNT = 5  # SPACE で 1 回に追加するボールの数
+MAX_BALLS = 50  # 1 個 0.3ms 程度なので 60fps に収まる数
+PHASES = ("collide", "move")  # step の処理段（timings のキー）：地形（BVH）への問い合わせ・それ以外の移動と反射
+
+def make_level(rng, count):
+    # 画面の枠と、ランダムに散らばった小さな多角形（辺の多い地形）
+    polygons = [[(1, 1), (WIDTH - 2, 1), (WIDTH - 2, HEIGHT - 2), (1, HEIGHT - 2)]]
+    for _ in range(count):
+        cx = rng.uniform(8, WIDTH - 8)
+        cy = rng.uniform(24, HEIGHT - 8)
+        size = rng.uniform(2, 5)
+        sides = rng.randint(3, 8)
+        rot = rng.uniform(0, 2 * math.pi)
+        polygons.append([(cx + size * math.cos(rot + 2 * math.pi * k / sides),
+                          cy + size * math.sin(rot + 2 * math.pi * k / sides)) for k in range(sides)])
+    return polygons
+
+class Simulation:
+    # 動かない地形（BVH）の中をボールが跳ね回る（pyxel を使わないので、ウィンドウなしでも回せる）
+    def __init__(self, seed=0, obstacles=OBSTACLES):
+        self.random = random.Random(seed)
+        self.level = StaticBVH.from_polygons(make_level(self.random, obstacles))
+        self.balls = []  # [x, y, vx, vy]
+        self.prev_positions = []  # 描画補間用
+        self.timings = dict.fromkeys(PHASES, 0)  # 直近のステップの処理段ごとの時間 [ns]
+        self._query_ns = 0  # move_ball の中で地形への問い合わせにかかった時間
+        self.spawn(1)
+
+    def spawn(self, count):
+        for _ in range(min(count, MAX_BALLS - len(self.balls))):
+            ball = [self.random.uniform(8, WIDTH - 8), 10.0, self.random.uniform(-2, 2), 0.0]
+            self.balls.append(ball)
+            self.prev_positions.append(tuple(ball[:2]))
+
+    def step(self, dt):
+        start = time.perf_counter_ns()
+        self._query_ns = 0
+        self.prev_positions = [(ball[0], ball[1]) for ball in self.balls]
+        for ball in self.balls:
+            self.move_ball(ball, dt)
+        total = time.perf_counter_ns() - start
+        self.timings = {"collide": self._query_ns, "move": total - self._query_ns}
+
+    def move_ball(self, ball, dt):
+        x, y, vx, vy = ball
+        vy += GRAVITY * dt
+        clock = time.perf_counter_ns
+
+        # 食い込んでいたら一番近い線分から外へ押し出す
+        t0 = clock()
+        hit = self.level.closest(x, y, RADIUS)
+        self._query_ns += clock() - t0
+        if hit is not None:
+            _, dist, (px, py) = hit
+            if dist > 0:
+                x = px + (x - px) / dist * RADIUS
+                y = py + (y - py) / dist * RADIUS
+
+        # 残りの時間で動く間に最初に当たる線分で止めて反射する（速くても線分をすり抜けない）
+        remaining = dt
+        for _ in range(MAX_BOUNCES):
+            t0 = clock()
+            hit = self.level.sweep(x, y, x + vx * remaining, y + vy * remaining, RADIUS)
+            self._query_ns += clock() - t0
+            if hit is None:
+                break
+            t, _, (nx, ny) = hit
+            x += vx * remaining * t
+            y += vy * remaining * t
+            dot = vx * nx + vy * ny
+            vx -= (1 + RESTITUTION) * dot * nx
+            vy -= (1 + RESTITUTION) * dot * ny
+            remaining *= 1 - t
+        else:
+            remaining = 0  # 跳ね返りが続く時は残りの時間を捨てる
+        ball[:] = x + vx * remaining, y + vy * remaining, vx, vy
+
+    def snapshot(self):
+        # ボールごとの (x, y, vx, vy, 前の x, 前の y) を 1 つの配列に詰める（地形は動かないので取らない）
+        balls = np.array([ball + list(prev) for ball, prev in zip(self.balls, self.prev_positions)],
+                         dtype=np.float64).reshape(-1, 6)
+        return balls, self.random.getstate()
+
+    def restore(self, snapshot):
+        balls, random_state = snapshot
+        rows = balls.tolist()
+        self.balls = [row[:4] for row in rows]
+        self.prev_positions = [tuple(row[4:]) for row in rows]
+        self.random.setstate(random_state)
+
+    def state(self):
+        return [v for ball in self.balls for v in ball]
+
+class App:
+    def __init__(self):
+        pyxel.init(WIDTH, HEIGHT, title="Circle vs Level (BVH)", fps=60)
+        self.sim = Simulation()
+        # 地形は動かないので、最初に 1 回だけ画像に描いておき毎フレーム貼るだけにする
+        self.level_image = pyxel.Image(WIDTH, HEIGHT)
+        self.level_image.cls(0)
+        for (x1, y1), (x2, y2) in zip(self.sim.level.seg_a.tolist(), self.sim.level.seg_b.tolist()):
+            self.level_image.line(x1, y1, x2, y2, 11)
+        self.timestep = FixedTimestep(hz=PHYSICS_HZ)
+        self.history = SnapshotRing()
+        pyxel.run(self.update, self.draw)
+
+    def update(self):
+        # R を押している間は 1 フレームずつ巻き戻す
+        steps = self.history.advance(self.sim, self.timestep, rewind=pyxel.btn(pyxel.KEY_R))
+        if steps is None:
+            return
+        if pyxel.btnp(pyxel.KEY_SPACE):
+            self.sim.spawn(SPAWN_COUNT)
+        for _ in range(steps):
+            self.sim.step(self.timestep.dt)
+
+    def draw(self):
+        pyxel.blt(0, 0, self.level_image, 0, 0, WIDTH, HEIGHT)
+        alpha = self.timestep.alpha
+        for (px, py), (x, y, _, _) in zip(self.sim.prev_positions, self.sim.balls):
+            pyxel.circ(lerp(px, x, alpha), lerp(py, y, alpha), RADIUS, 10)
+        pyxel.text(2, 2, f"BALLS:{len(self.sim.balls)} EDGES:{len(self.sim.level)}", 7)
+
+if __name__ == "__main__":
+    App()
@@ -1,26 +1,36 @@
 import pyxel
 import math
+from fixed_timestep import FixedTimestep, lerp
 
 WIDTH = 160
 HEIGHT = 120
 GRAVITY = 0.3
+PHYSICS_HZ = 120  # 物理の更新頻度（描画とは独立）
 
 class App:
     def __init__(self):
         pyxel.init(WIDTH, HEIGHT, title="Circle vs Line")
         self.x = 40
         self.y = 0
+        self.prev_x, self.prev_y = self.x, self.y  # 描画補間用の1ステップ前の位置
         self.vx = 1
         self.vy = 0
         self.radius = 5
         self.line_y = 80  # 線の高さ（水平）
+        self.timestep = FixedTimestep(hz=PHYSICS_HZ)
         pyxel.run(self.update, self.draw)
 
     def update(self):
+        for _ in range(self.timestep.advance()):
+            self.step(self.timestep.dt)
+
+    def step(self, dt):
+        self.prev_x, self.prev_y = self.x, self.y
+
         # 重力適用
-        self.vy += GRAVITY
-        self.x += self.vx
-        self.y += self.vy
+        self.vy += GRAVITY * dt
+        self.x += self.vx * dt
+        self.y += self.vy * dt
 
         # 衝突判定：円と水平線
         if self.y + self.radius > self.line_y:
@@ -38,6 +48,7 @@ class App:
     def draw(self):
         pyxel.cls(0)
         pyxel.line(0, self.line_y, WIDTH, self.line_y, 11)
-        pyxel.circ(self.x, self.y, self.radius, 10)
+        alpha = self.timestep.alpha
+        pyxel.circ(lerp(self.prev_x, self.x, alpha), lerp(self.prev_y, self.y, alpha), self.radius, 10)
 
 App()
@@ -1,39 +1,100 @@
 import pyxel
+import time
+import numpy as np
+from fixed_timestep import FixedTimestep, lerp
+from snapshot import SnapshotRing
 
 # 初期設定
 WIDTH = 160
 HEIGHT = 120
 GRAVITY = 0.5
 FLOOR_Y = HEIGHT - 10
+PHYSICS_HZ = 120  # 物理の更新頻度（描画とは独立）
+SLEEP_SPEED = 1  # これより遅いまま SLEEP_TIME 経ったら止めて眠らせる
+SLEEP_TIME = 15  # 30fps の 1 フレームが 1（跳ねた頂点で遅くなる間より長く）
+JUMP_SPEED = -8  # SPACE で起こして投げ上げる速さ
+PHASES = ("integrate", "collide", "respond")  # step の処理段（timings のキー）。respond は眠らせる判定を含む
 
-class App:
+class Simulation:
+    # ボールの状態と物理ステップ（pyxel を使わないので、ウィンドウなしでも回せる）
     def __init__(self):
-        pyxel.init(WIDTH, HEIGHT, title="Gravity Test")
         self.x = 50
         self.y = 0
+        self.prev_y = self.y  # 描画補間用の1ステップ前の位置
         self.vy = 0  # y方向の速度
         self.radius = 5
-        pyxel.run(self.update, self.draw)
+        self.awake = True
+        self.sleep_time = 0  # 遅いまま経った時間
+        self.timings = dict.fromkeys(PHASES, 0)  # 直近のステップの処理段ごとの時間 [ns]
+
+    def jump(self):
+        self.awake = True
+        self.sleep_time = 0
+        self.vy = JUMP_SPEED
+
+    def step(self, dt):
+        clock = time.perf_counter_ns
+        t0 = clock()
+        self.prev_y = self.y
+        # 眠っている間は動かさず、衝突判定もしない
+        if not self.awake:
+            self.timings = dict.fromkeys(PHASES, 0)
+            return
 
-    def update(self):
         # 重力を加える
-        self.vy += GRAVITY
-        self.y += self.vy
+        self.vy += GRAVITY * dt
+        self.y += self.vy * dt
+        t1 = clock()
 
         # 衝突判定（床に当たったら反発）
-        if self.y + self.radius > FLOOR_Y:
+        hit = self.y + self.radius > FLOOR_Y
+        t2 = clock()
+        if hit:
             self.y = FLOOR_Y - self.radius
             self.vy *= -0.6  # 反発係数（跳ね返り）
 
-            # 小さな速度なら停止させる
-            if abs(self.vy) < 1:
-                self.vy = 0
+        # 小さく跳ね続けている間は眠るまでの時間を数え、しばらく続いたら止める
+        self.sleep_time = self.sleep_time + dt if abs(self.vy) < SLEEP_SPEED else 0
+        if self.sleep_time >= SLEEP_TIME:
+            self.awake = False
+            self.vy = 0
+        self.timings = {"integrate": t1 - t0, "collide": t2 - t1, "respond": clock() - t2}
+
+    def snapshot(self):
+        return np.array([self.x, self.y, self.prev_y, self.vy, self.awake, self.sleep_time], dtype=np.float64)
+
+    def restore(self, snapshot):
+        self.x, self.y, self.prev_y, self.vy, awake, self.sleep_time = snapshot.tolist()
+        self.awake = bool(awake)
+
+    def state(self):
+        return [self.x, self.y, self.vy]
+
+class App:
+    def __init__(self):
+        pyxel.init(WIDTH, HEIGHT, title="Gravity Test")
+        self.sim = Simulation()
+        self.timestep = FixedTimestep(hz=PHYSICS_HZ)
+        self.history = SnapshotRing()
+        pyxel.run(self.update, self.draw)
+
+    def update(self):
+        # R を押している間は 1 フレームずつ巻き戻す
+        steps = self.history.advance(self.sim, self.timestep, rewind=pyxel.btn(pyxel.KEY_R))
+        if steps is None:
+            return
+        if pyxel.btnp(pyxel.KEY_SPACE):
+            self.sim.jump()
+        for _ in range(steps):
+            self.sim.step(self.timestep.dt)
 
     def draw(self):
         pyxel.cls(0)
         # 床
         pyxel.rect(0, FLOOR_Y, WIDTH, HEIGHT - FLOOR_Y, 3)
-        # ボール
-        pyxel.circ(self.x, self.y, self.radius, 8)
+        # ボール（物理ステップ間を補間して描く）
+        sim = self.sim
+        pyxel.circ(sim.x, lerp(sim.prev_y, sim.y, self.timestep.alpha), sim.radius, 8)
 
-App()
+if __name__ == "__main__":
+    App()
@@ -0,0 +1,238 @@
+import numpy as np
+
+from geometry import edge_normals
+
+# 接触多様体（1 組につき最大 2 点）を辺のクリッピングで作り、逐次インパルス法で速度を解く
+# 接触点は「参照辺・相手の辺・端点」の特徴 ID で前のステップと対応づけ、
+# 前回のインパルスから解き始める（ウォームスタート）ので少ない反復で落ち着く
+
+FALLBACK_FEATURE = 64  # クリッピングで点が残らなかった時の 1 点接触
+
+
+def outward_normals(verts):
+    # 各辺の外向きの単位法線 (..., 4, 2)（頂点の回り順によらない）
+    normals = edge_normals(verts)
+    mids = (verts + np.roll(verts, -1, axis=-2)) / 2 - verts.mean(axis=-2, keepdims=True)
+    return normals * np.where((normals * mids).sum(axis=-1) < 0, -1.0, 1.0)[..., None]
+
+
+def clip_manifolds(verts1, verts2, normal, reference, overlap, contact, tolerance=0.1):
+    # SAT の結果 (K 組) → 組番号 (M,)・接触点 (M, 2)・食い込み量 (M,)・特徴 ID (M,)
+    # normal は 1 → 2 向き、reference は SAT で選ばれた軸の番号（0〜3: 1 の辺、4〜7: 2 の辺）
+    # tolerance は組ごとに渡してもよい（離れている組も接触にしたい時は大きくする）
+    k = len(verts1)
+    rows = np.arange(k)
+    ref_is_2 = reference >= 4
+    ref_verts = np.where(ref_is_2[:, None, None], verts2, verts1)
+    inc_verts = np.where(ref_is_2[:, None, None], verts1, verts2)
+    ref_n = np.where(ref_is_2[:, None], -normal, normal)  # 参照辺の外向き法線（相手の方を向く）
+
+    # 軸が同じ平行な 2 辺のうち、相手の方を向いている方が参照辺
+    ref_edge = (outward_normals(ref_verts) * ref_n[:, None, :]).sum(axis=-1).argmax(axis=-1)
+    r0 = ref_verts[rows, ref_edge]
+    r1 = ref_verts[rows, (ref_edge + 1) % 4]
+
+    # 相手の辺のうち、外向き法線が参照辺と最も逆を向くものが接している辺
+    inc_edge = (outward_normals(inc_verts) * ref_n[:, None, :]).sum(axis=-1).argmin(axis=-1)
+    q0 = inc_verts[rows, inc_edge]
+    q1 = inc_verts[rows, (inc_edge + 1) % 4]
+
+    # 相手の辺を参照辺の両端の側面で切り取る（参照辺の向き u に沿った区間 [lo, hi] に収める）
+    u = r1 - r0
+    u /= np.maximum(np.hypot(u[:, 0], u[:, 1]), 1e-12)[:, None]
+    lo = (u * r0).sum(axis=-1)
+    hi = (u * r1).sum(axis=-1)
+    s0 = (u * q0).sum(axis=-1)
+    ds = (u * q1).sum(axis=-1) - s0
+    moving = ds != 0
+    safe = np.where(moving, ds, 1.0)
+    la = (lo - s0) / safe
+    lb = (hi - s0) / safe
+    lam_min = np.where(moving, np.maximum(0.0, np.minimum(la, lb)), 0.0)
+    lam_max = np.where(moving, np.minimum(1.0, np.maximum(la, lb)), 1.0)
+    valid = (lam_min <= lam_max) & (moving | ((lo <= s0) & (s0 <= hi)))
+    points = q0[:, None, :] + np.stack([lam_min, lam_max], axis=1)[..., None] * (q1 - q0)[:, None, :]
+
+    # 参照辺より内側（と少しの余裕）の点だけ残す
+    depth = -((points - r0[:, None, :]) * ref_n[:, None, :]).sum(axis=-1)
+    keep = valid[:, None] & (depth >= -np.asarray(tolerance, dtype=np.float64).reshape(-1, 1))
+    keep[:, 1] &= lam_max - lam_min > 1e-9  # 1 点に潰れたら重複させない
+    features = (ref_is_2 * 32 + ref_edge * 8 + inc_edge * 2)[:, None] + np.arange(2)
+
+    pair, slot = np.nonzero(keep)
+    fallback = np.flatnonzero(~keep.any(axis=1) & (overlap >= 0))
+    return (np.concatenate([pair, fallback]),
+            np.concatenate([points[pair, slot], contact[fallback]]),
+            np.concatenate([depth[pair, slot], overlap[fallback]]),
+            np.concatenate([features[pair, slot], np.full(len(fallback), FALLBACK_FEATURE)]))
+
+
+def contact_keys(i, j, feature):
+    # (i, j, 特徴 ID) → 1 つの整数（前のステップの接触と突き合わせる時に使う）
+    return (i.astype(np.int64) * (1 << 24) + j) * 128 + feature
+
+
+MAX_SEQUENTIAL_BATCHES = 32  # 並んだ順に解く時の組の数がこれを超えたら、色分けで組の数を減らす
+
+
+def sequential_levels(a, b, dynamic, limit):
+    # 各接触を、同じ動く物体を含む前の接触より後の組に入れる（動かない物体は速度が変わらないので何度含んでもよい）
+    # → 組の番号 (M,)。組の順に解けば、並んだ順に 1 つずつ解くのと同じ結果になる。組が limit を超えたら None
+    m = len(a)
+    ends = np.stack([a, b], axis=1).ravel()
+    by_body = np.argsort(ends, kind="stable")
+    same = ends[by_body[1:]] == ends[by_body[:-1]]
+    previous = np.full(2 * m, -1, dtype=np.intp)  # 同じ物体を含む 1 つ前の接触（なければ -1）
+    previous[by_body[1:][same]] = by_body[:-1][same] // 2
+    previous[~dynamic[ends]] = -1
+    previous = previous.reshape(-1, 2)
+    has_previous = previous >= 0
+    level = np.zeros(m, dtype=np.intp)
+    for _ in range(limit):
+        new = np.where(has_previous, level[previous] + 1, 0).max(axis=1, initial=0)
+        if np.array_equal(new, level):
+            return level
+        level = new
+    return None
+
+
+def color_levels(a, b, dynamic, priority):
+    # 同じ動く物体を 2 回含まないように接触を組に分ける
+    # 物体を共有する相手より priority が大きい接触から取っていき、各組をこれ以上足せないところまで埋める → 組の番号 (M,)
+    color = np.full(len(a), -1, dtype=np.intp)
+    remaining = np.arange(len(a))
+    count = 0
+    while len(remaining):
+        blocked = np.zeros(len(dynamic), dtype=bool)  # この組で使った動く物体
+        candidates = remaining
+        while len(candidates):
+            ca, cb, cp = a[candidates], b[candidates], priority[candidates]
+            best = np.zeros(len(dynamic), dtype=priority.dtype)
+            np.maximum.at(best, ca, cp)
+            np.maximum.at(best, cb, cp)
+            pick = (~dynamic[ca] | (best[ca] == cp)) & (~dynamic[cb] | (best[cb] == cp))
+            color[candidates[pick]] = count
+            blocked[ca[pick]] = True
+            blocked[cb[pick]] = True
+            blocked &= dynamic
+            candidates = candidates[~pick]
+            candidates = candidates[~blocked[a[candidates]] & ~blocked[b[candidates]]]
+        remaining = remaining[color[remaining] != count]
+        count += 1
+    return color
+
+
+def contact_batches(a, b, dynamic, priority, max_batches=MAX_SEQUENTIAL_BATCHES):
+    # 同じ動く物体を含まない接触の組に分ける → 組ごとに並べた順番、組の境目 (組の数 + 1,)
+    # ふつうは並んだ順に解くのと同じになる分け方にする（積み重ねが少ない反復で落ち着く）
+    # 大きな山のように前後につながる接触の列が長い時は、組の数が少なくなる色分けにする
+    level = sequential_levels(a, b, dynamic, max_batches)
+    if level is None:
+        level = color_levels(a, b, dynamic, priority)
+    order = np.argsort(level, kind="stable")
+    return order, np.searchsorted(level[order], np.arange(level.max(initial=-1) + 2))
+
+
+class ContactSolver:
+    # contacts: 配列の組 (i, j, 法線 (M, 2), 接触点 (M, 2), 食い込み量, 特徴 ID)。法線は i → j 向き、食い込み量が負なら離れている
+    # 接触ごとの値は配列にまとめ、同じ動く物体を含まない接触の組ごとに NumPy で一度に解く
+    # （組の中の接触は互いに影響しないので、1 つずつ順に解くのと同じ。組から組へは順に解く）
+    def __init__(self, iterations=8, restitution=0.0, friction=0.3, baumgarte=0.2, slop=0.05, bounce_threshold=0.5):
+        self.iterations = iterations
+        self.restitution = restitution
+        self.friction = friction
+        self.baumgarte = baumgarte  # 食い込みを 1 ステップで戻す割合
+        self.slop = slop  # この程度の食い込みは許す（接触が切れたりつながったりするのを防ぐ）
+        self.bounce_threshold = bounce_threshold  # これより遅くぶつかった時は跳ね返らない
+        self.touching = 0.25  # 隙間がこれより小さければ接しているとみなして跳ね返す
+        # 前のステップの接触のキー（昇順）と (法線方向, 接線方向) のインパルス。毎ステップ新しい配列に置き換える
+        self.cache = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)))
+        self.batch_count = 0  # 直近のステップで分けた接触の組の数
+
+    def solve(self, bodies, contacts, dt, resting_speed=0.0):
+        # resting_speed より遅い衝突も跳ね返らない（重力で数ステップのうちに付く速さ。床の上で小さく跳ね続けないように）
+        threshold = max(self.bounce_threshold, resting_speed)
+        i, j, normal, point, depth, feature = contacts
+
+        # 接触している物体の (vx, vy, omega)・位置・質量の逆数を配列に集める（i, j は集めた中での番号 a, b にする）
+        ids = np.unique(np.concatenate([i, j]))
+        state = np.array([(body.vx, body.vy, body.omega, body.cx, body.cy, body.inv_mass, body.inv_inertia)
+                          for body in map(bodies.__getitem__, ids.tolist())], dtype=np.float64).reshape(-1, 7)
+        velocity = state[:, :3].copy()
+        a = np.searchsorted(ids, i)
+        b = np.searchsorted(ids, j)
+
+        # 接触ごとに、1 と 2 の (vx, vy, omega) を並べた 6 要素に掛けると接触点での相対速度の法線・接線成分になる行 (M, 6)
+        # 単位インパルスで 6 要素が変わる量は、その行に質量・慣性モーメントの逆数を掛けたもの
+        nx, ny = normal[:, 0], normal[:, 1]
+        tx, ty = ny, -nx
+        r1 = point - state[a, 3:5]
+        r2 = point - state[b, 3:5]
+        jn = np.stack([-nx, -ny, nx * r1[:, 1] - ny * r1[:, 0], nx, ny, r2[:, 0] * ny - r2[:, 1] * nx], axis=1)
+        jt = np.stack([-tx, -ty, tx * r1[:, 1] - ty * r1[:, 0], tx, ty, r2[:, 0] * ty - r2[:, 1] * tx], axis=1)
+        inv = np.repeat(np.stack([state[a, 5], state[a, 6], state[b, 5], state[b, 6]], axis=1), [2, 1, 2, 1], axis=1)
+        k_normal = (jn * jn * inv).sum(axis=1)
+        valid = k_normal > 0
+        m = int(valid.sum())
+        a, b, jn, jt, inv, depth, k_normal = a[valid], b[valid], jn[valid], jt[valid], inv[valid], depth[valid], k_normal[valid]
+        ab = np.stack([a, b], axis=1).ravel()  # 接触ごとに 1, 2 の順に並べた物体の番号
+        mn = jn * inv
+        mt = jt * inv
+
+        # 目標の離れる速さ：食い込みを戻す分と、速くぶつかった時の跳ね返り
+        # 離れている接触（投機的接触）は、次のステップでちょうど隙間が埋まる速さまでは近づいてよい
+        vn = (velocity[ab].reshape(-1, 6) * jn).sum(axis=1)
+        target = np.where(depth < 0, depth / dt, self.baumgarte / dt * np.maximum(0.0, depth - self.slop))
+        bounce = (depth > -self.touching) & (vn < -threshold)
+        target = np.where(bounce, np.maximum(target, -self.restitution * vn), target)
+
+        # 前のステップで同じ特徴の接触があれば、そのインパルスから解き始める
+        # （跳ね返りの速さは加える前の速度で決めたいので、目標を決めてから加える）
+        keys = contact_keys(i[valid], j[valid], feature[valid])
+        cached_keys, cached = self.cache
+        impulse = np.zeros((m, 2))  # 法線方向・接線方向
+        if len(cached_keys):
+            slot = np.minimum(np.searchsorted(cached_keys, keys), len(cached_keys) - 1)
+            found = cached_keys[slot] == keys
+            impulse[found] = cached[slot[found]]
+        np.add.at(velocity, ab, (impulse[:, :1] * mn + impulse[:, 1:] * mt).reshape(-1, 3))
+
+        # 組ごとに並べ替える（組の中は連続した範囲になる）。色分けの順番はキーから決めるので、毎ステップほぼ同じ組になる
+        dynamic = state[:, 5] + state[:, 6] > 0
+        order, bounds = contact_batches(a, b, dynamic, keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15))
+        ab = ab.reshape(-1, 2)[order].ravel()
+        keys, jn, jt, mn, mt, target, impulse = keys[order], jn[order], jt[order], mn[order], mt[order], target[order], impulse[order]
+        k_normal = k_normal[order]
+        k_tangent = (jt * mt).sum(axis=1)
+        mass_n = 1 / k_normal
+        mass_t = 1 / np.where(k_tangent > 0, k_tangent, np.inf)
+        # 組ごとの範囲。法線・接線の 2 つをまとめて扱う（jacobian は (M, 6, 2)、response は (M, 2, 6)、接線方向の目標は 0）
+        jacobian = np.stack([jn, jt], axis=2)
+        response = np.stack([mn, mt], axis=1)
+        masses = np.stack([mass_n, mass_t], axis=1)
+        targets = np.stack([target, np.zeros(m)], axis=1)
+        batches = [(ab[2 * s:2 * e], jacobian[s:e], response[s:e], masses[s:e], targets[s:e], impulse[s:e])
+                   for s, e in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+        for _ in range(self.iterations):
+            for ab_k, jacobian_k, response_k, masses_k, targets_k, impulse_k in batches:
+                v = velocity[ab_k]
+                new = impulse_k + masses_k * (targets_k - np.einsum("ij,ijk->ik", v.reshape(-1, 6), jacobian_k))
+                # 法線方向：合計のインパルスが押す向き（0 以上）になるようにする
+                pn = np.maximum(new[:, 0], 0.0, out=new[:, 0])
+                # 接線方向（摩擦）：合計を ±friction × 法線インパルスに収める
+                limit = self.friction * pn
+                np.minimum(np.maximum(new[:, 1], -limit, out=new[:, 1]), limit, out=new[:, 1])
+                delta = np.einsum("ik,ikj->ij", new - impulse_k, response_k).reshape(-1, 3)
+                impulse_k[:] = new
+                velocity[ab_k] = v + delta
+
+        for body, (vx, vy, omega), moves in zip(map(bodies.__getitem__, ids.tolist()), velocity.tolist(), dynamic.tolist()):
+            if moves:
+                body.vx, body.vy, body.omega = vx, vy, omega
+
+        # 前のステップの配列は書き換えずに、新しい配列に置き換える（スナップショットは置き換える前の配列をそのまま持っている）
+        keep = np.argsort(keys)
+        self.cache = (keys[keep], impulse[keep])
+        self.batch_count = len(batches)
+        return m
@@ -0,0 +1,39 @@
+import time
+
+
+class FixedTimestep:
+    # 実経過時間を貯めて、固定幅の物理ステップを必要な回数だけ回す
+    # dt は「tick_rate で update していた時の 1 回分」を 1.0 とした単位なので、
+    # 1 フレームあたりで調整されていた定数（重力など）をそのまま使える
+    def __init__(self, hz=120, tick_rate=30, max_frames=2, clock=time.perf_counter):
+        self.hz = hz
+        self.tick_rate = tick_rate
+        self.step_seconds = 1 / hz
+        self.dt = tick_rate / hz
+        # 1 回の advance で回す上限（超えた分の時間は捨てて、処理落ちの悪循環を防ぐ）
+        self.max_steps = max(1, round(max_frames * hz / tick_rate))
+        self.clock = clock
+        self.accumulator = 0.0
+        self.alpha = 0.0  # 描画用の補間係数（前ステップ → 現ステップ）
+        self.dropped = 0.0  # 捨てた時間 [秒]
+        self._last = None
+
+    def advance(self, elapsed=None):
+        # 経過時間（省略時は前回からの実時間）を足して、回すべきステップ数を返す
+        now = self.clock()
+        if elapsed is None:
+            elapsed = 1 / self.tick_rate if self._last is None else now - self._last
+        self._last = now
+
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.step_seconds + 1e-9)
+        self.accumulator = max(0.0, self.accumulator - steps * self.step_seconds)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.step_seconds
+            steps = self.max_steps
+        self.alpha = self.accumulator / self.step_seconds
+        return steps
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
@@ -0,0 +1,58 @@
+import numpy as np
+
+# 2D 衝突判定の共通関数（複数の形状を配列でまとめて処理する）
+# 先頭の次元はいくつあってもよい：1 個なら (4, 2)、N 個なら (N, 4, 2) のように返す
+
+
+def obb_vertices(cx, cy, w, h, angle):
+    # 中心・サイズ・角度[rad] → 4 頂点 (..., 4, 2)。頂点の順は (-,-), (+,-), (+,+), (-,+)
+    cx, cy, w, h, angle = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (cx, cy, w, h, angle)))
+    cos_a = np.cos(angle)[..., None]
+    sin_a = np.sin(angle)[..., None]
+    x = np.array([-0.5, 0.5, 0.5, -0.5]) * w[..., None]
+    y = np.array([-0.5, -0.5, 0.5, 0.5]) * h[..., None]
+    return np.stack([cx[..., None] + x * cos_a - y * sin_a,
+                     cy[..., None] + x * sin_a + y * cos_a], axis=-1)
+
+
+def edge_normals(vertices):
+    # 各辺 (i → i+1) の単位法線 (-dy, dx) / 長さ (..., V, 2)。長さ 0 の辺は (0, 0)
+    edges = np.roll(vertices, -1, axis=-2) - vertices
+    length = np.hypot(edges[..., 0], edges[..., 1])[..., None]
+    normals = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+
+def project_onto_axes(vertices, axes):
+    # 頂点 (..., V, 2) を軸 (..., K, 2) に投影した最小・最大 (..., K)
+    dots = vertices @ np.swapaxes(axes, -1, -2)  # (..., V, K)
+    return dots.min(axis=-2), dots.max(axis=-2)
+
+
+def point_segment_distances(points, seg_a, seg_b):
+    # 点 (..., P, 2) と線分 a→b (..., M, 2) の全組の距離 (..., P, M) と最近点 (..., P, M, 2)
+    # （長さ 2 の軸で sum すると遅いので x, y を別々に計算する）
+    px = points[..., :, None, 0]
+    py = points[..., :, None, 1]
+    ax = seg_a[..., None, :, 0]
+    ay = seg_a[..., None, :, 1]
+    dx = seg_b[..., None, :, 0] - ax
+    dy = seg_b[..., None, :, 1] - ay
+    len_sq = dx * dx + dy * dy
+    num = (px - ax) * dx + (py - ay) * dy
+    t = np.divide(num, len_sq, out=np.zeros(np.broadcast_shapes(num.shape, len_sq.shape)), where=len_sq > 0)
+    t = np.clip(t, 0.0, 1.0)
+    cx = ax + t * dx
+    cy = ay + t * dy
+    return np.hypot(px - cx, py - cy), np.stack([cx, cy], axis=-1)
+
+
+def obb_edges(vertices):
+    # 頂点 (..., 4, 2) → 各辺の始点・終点
+    return vertices, np.roll(vertices, -1, axis=-2)
+
+
+def reflect_velocities(v, n):
+    # 速度 (..., 2) を単位法線 (..., 2) で反射
+    dot = (v * n).sum(axis=-1, keepdims=True)
+    return v - 2 * dot * n
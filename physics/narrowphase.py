@@ -0,0 +1,44 @@
+import numpy as np
+
+from geometry import obb_edges, edge_normals, project_onto_axes, point_segment_distances
+
+# 候補の組 K 個の SAT をまとめて配列で解く（verts1, verts2 は (K, 4, 2)）
+
+
+def sat_overlaps(verts1, verts2):
+    # 両方の辺の法線 8 本に投影して、重なっているか (K,)・軸ごとの重なり (K, 8)・軸 (K, 8, 2)
+    axes = np.concatenate([edge_normals(verts1), edge_normals(verts2)], axis=-2)
+    min1, max1 = project_onto_axes(verts1, axes)
+    min2, max2 = project_onto_axes(verts2, axes)
+    colliding = ~np.any((max1 < min2) | (max2 < min1), axis=-1)
+    return colliding, np.minimum(max1, max2) - np.maximum(min1, min2), axes
+
+
+def sat_batch(verts1, verts2):
+    # 組ごとに 重なっているか (K,)・最小の重なり (K,)・押し戻す軸 (K, 2)・接触点 (K, 2)・軸の番号 (K,)
+    # 軸の番号は 0〜3 が verts1 の辺、4〜7 が verts2 の辺（接触面を切り出す時の参照辺）
+    colliding, overlaps, axes = sat_overlaps(verts1, verts2)
+
+    # 重なりが最小の軸で押し戻す（向きは 1 → 2 にそろえる）
+    # 面どうしが接していると両方の辺がほぼ同じ重なりになるので、はっきり小さい時だけ 2 の辺を選ぶ
+    # （参照辺がステップごとに入れ替わらず、接触のキャッシュが続けて使える）
+    best1 = overlaps[..., :4].argmin(axis=-1)
+    best2 = overlaps[..., 4:].argmin(axis=-1) + 4
+    overlap1 = np.take_along_axis(overlaps, best1[..., None], axis=-1)[..., 0]
+    overlap2 = np.take_along_axis(overlaps, best2[..., None], axis=-1)[..., 0]
+    best = np.where(overlap2 < overlap1 * 0.95 - 0.01, best2, best1)[..., None]
+    overlap = np.take_along_axis(overlaps, best, axis=-1)[..., 0]
+    axis = np.take_along_axis(axes, best[..., None], axis=-2)[..., 0, :]
+    centers = verts2.mean(axis=-2) - verts1.mean(axis=-2)
+    axis = np.where(((axis * centers).sum(axis=-1) < 0)[..., None], -axis, axis)
+
+    # verts1 の辺に最も近い verts2 の頂点を接触点にする（重なっている組だけ調べる）
+    contact = np.zeros_like(axis)
+    if colliding.any():
+        v1 = verts1[colliding]
+        v2 = verts2[colliding]
+        dists, _ = point_segment_distances(v2, *obb_edges(v1))
+        nearest = dists.reshape(len(v2), -1).argmin(axis=-1) // dists.shape[-1]
+        contact[colliding] = v2[np.arange(len(v2)), nearest]
+
+    return colliding, overlap, axis, contact, best[..., 0]
@@ -1,194 +1,130 @@
 import pyxel
 import math
+import random
+from fixed_timestep import FixedTimestep, lerp
+from geometry import obb_vertices
+from obb_world import OBB, World, PHASES
+from profiler import PhaseProfiler
+from snapshot import SnapshotRing, capture_world, restore_world
 
 WIDTH = 160
 HEIGHT = 120
-SUBSTEPS = 4  # サブステップ数
-
-def get_obb_vertices(cx, cy, w, h, angle_deg):
-    angle = math.radians(angle_deg)
-    cos_a = math.cos(angle)
-    sin_a = math.sin(angle)
-    dx = w / 2
-    dy = h / 2
-    corners = [(-dx, -dy), (dx, -dy), (dx, dy), (-dx, dy)]
-    return [
-        (
-            cx + x * cos_a - y * sin_a,
-            cy + x * sin_a + y * cos_a
-        )
-        for (x, y) in corners
-    ]
-
-def get_axes(vertices):
-    axes = []
-    for i in range(4):
-        x1, y1 = vertices[i]
-        x2, y2 = vertices[(i + 1) % 4]
-        dx = x2 - x1
-        dy = y2 - y1
-        length = math.hypot(dx, dy)
-        if length == 0:
-            continue
-        nx = -dy / length
-        ny = dx / length
-        axes.append((nx, ny))
-    return axes
-
-def project(vertices, axis):
-    dots = [x * axis[0] + y * axis[1] for x, y in vertices]
-    return min(dots), max(dots)
-
-def overlap(min1, max1, min2, max2):
-    return not (max1 < min2 or max2 < min1), min(max1, max2) - max(min1, min2)
-
-def point_to_segment_distance(px, py, x1, y1, x2, y2):
-    dx = x2 - x1
-    dy = y2 - y1
-    if dx == 0 and dy == 0:
-        return math.hypot(px - x1, py - y1), x1, y1
-    t = ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)
-    t = max(0, min(1, t))
-    closest_x = x1 + t * dx
-    closest_y = y1 + t * dy
-    dist = math.hypot(px - closest_x, py - closest_y)
-    return dist, closest_x, closest_y
-
-class OBB:
-    def __init__(self, cx, cy, w, h, angle=0.0, mass=1.0):
-        self.cx = cx
-        self.cy = cy
-        self.w = w
-        self.h = h
-        self.angle = math.radians(angle)
-        self.vx = 0
-        self.vy = 0
-        self.omega = 0
-        self.mass = mass
-        self.inertia = (1 / 12) * self.mass * (self.w ** 2 + self.h ** 2)
+PHYSICS_HZ = 30  # 物理の更新頻度（CCD で衝突時刻を求めるので 30fps の update 1 回あたり 1 ステップで足りる）
+SPAWN_COUNT = 20  # SPACE で 1 回に追加する箱の数
+MAX_BODIES = 400
+GRAVITY = 0.3  # G で切り替え（箱が床に積み重なる）
+GRAVITY_RESTITUTION = 0.5  # 重力がある時の反発係数（完全弾性のままだと積み重なった箱が落ち着かない）
+
+class Simulation:
+    # 箱の配置と物理ステップ（pyxel を使わないので、ウィンドウなしでも回せる）
+    # 乱数は seed から作るので、同じ操作なら何度回しても同じ結果になる
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        # 画面の外側に動かない壁を置き、箱は接触ソルバで跳ね返す（速度や角速度の上限はいらない）
+        self.world = World(WIDTH, HEIGHT, ccd=True, iterations=12, restitution=1.0, bounds=False)
+        self.obb1 = self.world.add(OBB(60, 60, 40, 20, angle=10))
+        self.obb2 = self.world.add(OBB(120, 50, 40, 20, angle=-5))
+        for cx, cy, w, h in [(WIDTH / 2, -4, WIDTH + 16, 8), (WIDTH / 2, HEIGHT + 4, WIDTH + 16, 8),
+                             (-4, HEIGHT / 2, 8, HEIGHT + 16), (WIDTH + 4, HEIGHT / 2, 8, HEIGHT + 16)]:
+            self.world.add(OBB(cx, cy, w, h, mass=math.inf))
+        self.obb2.vx = -4.0  # 高速でもトン抜けしない！
+        self.obb2.vy = 0.7
+        self.prev_poses = [(obb.cx, obb.cy, obb.angle) for obb in self.world.bodies]  # 描画補間用
+
+    def spawn(self, count):
+        # 小さな箱をまとめて追加（多数の箱でもブロードフェーズで組を絞る）
+        for _ in range(min(count, MAX_BODIES - len(self.world.bodies))):
+            obb = self.world.add(OBB(self.random.uniform(10, WIDTH - 10), self.random.uniform(10, HEIGHT - 10),
+                                     self.random.uniform(3, 6), self.random.uniform(2, 4),
+                                     angle=self.random.uniform(0, 360)))
+            obb.vx = self.random.uniform(-1, 1)
+            obb.vy = self.random.uniform(-1, 1)
+            self.prev_poses.append((obb.cx, obb.cy, obb.angle))
+
+    def toggle_gravity(self):
+        self.world.gravity = 0.0 if self.world.gravity else GRAVITY
+        self.world.solver.restitution = GRAVITY_RESTITUTION if self.world.gravity else 1.0
+        for obb in self.world.bodies:
+            obb.wake()  # 無重力で止まって眠っていた箱も落ち始めるように
+
+    @property
+    def timings(self):
+        return self.world.timings
 
-    def move(self, dt):
-        self.cx += self.vx * dt
-        self.cy += self.vy * dt
-        self.angle += self.omega * dt
-        self.omega *= 0.98  # 摩擦減衰
+    def simulate(self, dt):
+        self.prev_poses = [(obb.cx, obb.cy, obb.angle) for obb in self.world.bodies]
+        self.world.step(dt)
 
-    def apply_torque(self, torque):
-        alpha = torque / self.inertia
-        self.omega += alpha
+    def snapshot(self):
+        return capture_world(self.world), self.random.getstate()
 
-    def get_vertices(self):
-        return get_obb_vertices(self.cx, self.cy, self.w, self.h, math.degrees(self.angle))
+    def restore(self, snapshot):
+        world_snapshot, random_state = snapshot
+        restore_world(self.world, world_snapshot)
+        self.random.setstate(random_state)
+        self.prev_poses = [(obb.cx, obb.cy, obb.angle) for obb in self.world.bodies]
 
-    def radius(self):
-        return math.hypot(self.w, self.h) / 2
+    def state(self):
+        # 結果の比較用に、全部の箱の位置・角度・速度を並べる
+        return [v for obb in self.world.bodies for v in (obb.cx, obb.cy, obb.angle, obb.vx, obb.vy, obb.omega)]
 
 class App:
     def __init__(self):
-        pyxel.init(WIDTH, HEIGHT, title="OBB Collision (Substeps Fix)")
-        self.obb1 = OBB(60, 60, 40, 20, angle=10)
-        self.obb2 = OBB(120, 50, 40, 20, angle=-5)
-        self.obb2.vx = -4.0  # 高速でもトン抜けしない！
-        self.obb2.vy = 0.7
+        pyxel.init(WIDTH, HEIGHT, title="OBB Collision (CCD)")
+        self.sim = Simulation()
+        self.timestep = FixedTimestep(hz=PHYSICS_HZ)
+        self.profiler = PhaseProfiler(PHASES)  # P で処理段ごとの時間を表示、O で CSV に記録
+        self.trace_message = ""
+        self.history = SnapshotRing()
         pyxel.run(self.update, self.draw)
 
     def update(self):
-        for _ in range(SUBSTEPS):
-            self.simulate(1 / SUBSTEPS)
-
-    def simulate(self, dt):
-        self.obb1.move(dt)
-        self.obb2.move(dt)
-
-        v1 = self.obb1.get_vertices()
-        v2 = self.obb2.get_vertices()
-
-        is_colliding, overlap_amt, axis, contact_point = self.sat_collision_response(v1, v2)
-
-        if is_colliding:
-            m1 = self.obb1.mass
-            m2 = self.obb2.mass
-
-            rvx = self.obb2.vx - self.obb1.vx
-            rvy = self.obb2.vy - self.obb1.vy
-            rel_vel = rvx * axis[0] + rvy * axis[1]
-
-            if rel_vel < 0:
-                impulse = (2 * rel_vel) / (1/m1 + 1/m2)
-                ix = impulse * axis[0]
-                iy = impulse * axis[1]
-
-                self.obb1.vx += ix / m1
-                self.obb1.vy += iy / m1
-                self.obb2.vx -= ix / m2
-                self.obb2.vy -= iy / m2
-
-                for obb, sign in zip([self.obb1, self.obb2], [+1, -1]):
-                    r_x = contact_point[0] - obb.cx
-                    r_y = contact_point[1] - obb.cy
-                    torque = r_x * iy - r_y * ix
-                    obb.apply_torque(sign * torque)
-
-                # 補正強化（半分ずつ押し戻す）
-                correction = overlap_amt
-                self.obb1.cx -= axis[0] * (correction / 2)
-                self.obb1.cy -= axis[1] * (correction / 2)
-                self.obb2.cx += axis[0] * (correction / 2)
-                self.obb2.cy += axis[1] * (correction / 2)
-
-        for obb in [self.obb1, self.obb2]:
-            r = obb.radius()
-            if obb.cx - r < 0 or obb.cx + r > WIDTH:
-                obb.vx *= -1
-                obb.cx = max(r, min(WIDTH - r, obb.cx))
-            if obb.cy - r < 0 or obb.cy + r > HEIGHT:
-                obb.vy *= -1
-                obb.cy = max(r, min(HEIGHT - r, obb.cy))
-
-            speed = math.hypot(obb.vx, obb.vy)
-            if speed > 6:
-                scale = 6 / speed
-                obb.vx *= scale
-                obb.vy *= scale
-            if abs(obb.omega) > 0.6:
-                obb.omega *= 0.95
-
-    def sat_collision_response(self, verts1, verts2):
-        axes1 = get_axes(verts1)
-        axes2 = get_axes(verts2)
-        smallest_overlap = float("inf")
-        best_axis = (0, 0)
-        contact_point = verts2[0]
-
-        for axis in axes1 + axes2:
-            min1, max1 = project(verts1, axis)
-            min2, max2 = project(verts2, axis)
-            is_ol, ol_amt = overlap(min1, max1, min2, max2)
-            if not is_ol:
-                return False, 0, (0, 0), (0, 0)
-            if ol_amt < smallest_overlap:
-                smallest_overlap = ol_amt
-                best_axis = axis
-
-        best_distance = float("inf")
-        for px, py in verts2:
-            for i in range(4):
-                x1, y1 = verts1[i]
-                x2, y2 = verts1[(i + 1) % 4]
-                dist, _, _ = point_to_segment_distance(px, py, x1, y1, x2, y2)
-                if dist < best_distance:
-                    best_distance = dist
-                    contact_point = (px, py)
-
-        return True, smallest_overlap, best_axis, contact_point
+        # R を押している間は 1 フレームずつ巻き戻す
+        steps = self.history.advance(self.sim, self.timestep, rewind=pyxel.btn(pyxel.KEY_R))
+        if steps is None:
+            return
+        if pyxel.btnp(pyxel.KEY_SPACE):
+            self.sim.spawn(SPAWN_COUNT)
+        if pyxel.btnp(pyxel.KEY_G):
+            self.sim.toggle_gravity()
+        if pyxel.btnp(pyxel.KEY_P):
+            self.profiler.toggle()
+        if pyxel.btnp(pyxel.KEY_O):
+            path = self.profiler.toggle_trace()
+            self.trace_message = f"SAVED {path}" if path else ""
+        for _ in range(steps):
+            self.sim.simulate(self.timestep.dt)
+            self.profiler.add(self.sim.world.timings)
+        self.profiler.end_frame()
 
     def draw(self):
         pyxel.cls(0)
-        for obb, color in zip([self.obb1, self.obb2], [11, 10]):
-            verts = obb.get_vertices()
-            for i in range(4):
-                x1, y1 = verts[i]
-                x2, y2 = verts[(i + 1) % 4]
+        # 物理ステップ間を補間して、全部の箱の頂点を 1 回でまとめて求める
+        alpha = self.timestep.alpha
+        world = self.sim.world
+        bodies = world.bodies
+        poses = [[lerp(p, c, alpha) for p, c in zip(prev, (obb.cx, obb.cy, obb.angle))]
+                 for obb, prev in zip(bodies, self.sim.prev_poses)]
+        cx, cy, angle = zip(*poses)
+        all_verts = obb_vertices(cx, cy, [obb.w for obb in bodies], [obb.h for obb in bodies], angle)
+        for obb, verts in zip(bodies, all_verts.tolist()):
+            color = 11 if obb is self.sim.obb1 else 10 if obb is self.sim.obb2 else 6 if obb.awake else 5  # 眠っている箱は暗く
+            for j in range(4):
+                x1, y1 = verts[j]
+                x2, y2 = verts[(j + 1) % 4]
                 pyxel.line(int(x1), int(y1), int(x2), int(y2), color)
 
-App()
+        pyxel.text(2, 2, f"BODIES:{len(bodies)} PAIRS:{world.pair_count} TOI:{world.impact_count}", 7)
+        pyxel.text(2, 10, f"SLEEP:{world.sleeping_count}", 7)
+        if self.profiler.enabled:
+            lines = self.profiler.overlay_lines()
+            pyxel.rect(0, 18, 112, len(lines) * 8 + 2, 1)
+            for k, line in enumerate(lines):
+                pyxel.text(2, 20 + k * 8, line, 7)
+        elif self.profiler.trace is not None:
+            pyxel.text(2, 18, f"REC {len(self.profiler.trace)}", 8)
+        if self.trace_message:
+            pyxel.text(2, HEIGHT - 8, self.trace_message, 7)
+
+if __name__ == "__main__":
+    App()
@@ -0,0 +1,325 @@
+import math
+import time
+
+import numpy as np
+
+from ccd import times_of_impact
+from contact_solver import ContactSolver, clip_manifolds
+from geometry import obb_vertices
+from narrowphase import sat_batch
+
+SPECULATIVE_DISTANCE = 1.0  # これだけ離れている組までは接触として解く
+RESTING_STEPS = 3  # 重力でこのステップ数のうちに付く速さの衝突は跳ね返さない
+# step の処理段（timings のキー）：候補の組・SAT・接触点の切り出し・速度・移動（CCD 込み）・画面の端・眠り
+PHASES = ("broadphase", "narrowphase", "manifold", "solve", "move", "bounds", "sleep")
+
+
+class OBB:
+    # mass=math.inf で動かない物体（床・壁）になる
+    # 頂点と外接円の半径は World がまとめて覚えておく（動いた物体の行だけ計算し直す）
+    __slots__ = ("cx", "cy", "w", "h", "angle", "vx", "vy", "omega", "mass", "inertia", "inv_mass", "inv_inertia",
+                 "awake", "sleep_time", "island")
+
+    def __init__(self, cx, cy, w, h, angle=0.0, mass=1.0):
+        self.cx = cx
+        self.cy = cy
+        self.angle = math.radians(angle)
+        self.vx = 0
+        self.vy = 0
+        self.omega = 0
+        self.set_shape(w, h, mass)
+        self.awake = True
+        self.sleep_time = 0.0  # 速度と角速度が小さいまま経った時間
+        self.island = None  # 眠っている間は一緒に眠った物体のリスト（1 つ起きたら全員起こす）
+
+    def set_shape(self, w, h, mass):
+        # 大きさか質量を変えたら、慣性モーメントと逆数も求め直す
+        self.w = w
+        self.h = h
+        self.mass = mass
+        self.inertia = (1 / 12) * mass * (w ** 2 + h ** 2)
+        self.inv_mass = 0.0 if math.isinf(mass) else 1 / mass
+        self.inv_inertia = 0.0 if math.isinf(mass) else 1 / self.inertia
+
+    def move(self, dt):
+        self.cx += self.vx * dt
+        self.cy += self.vy * dt
+        self.angle += self.omega * dt
+
+    def apply_torque(self, torque):
+        self.wake()
+        alpha = torque / self.inertia
+        self.omega += alpha
+
+    def wake(self):
+        for body in self.island or [self]:
+            body.awake = True
+            body.sleep_time = 0.0
+            body.island = None
+
+
+class SweepAndPrune:
+    # 外接円の x 区間を左端で並べ、区間が重なる組だけを候補にする
+    # 並び順は次のステップに持ち越す（ほとんど入れ替わらないので安定ソートがほぼ O(N) で済む）
+    def __init__(self):
+        self.order = np.zeros(0, dtype=np.intp)
+
+    def pairs(self, x, y, r):
+        # 中心 x, y と半径 r の配列 → 外接円が重なる組の添字 (a, b)
+        n = len(x)
+        if len(self.order) != n:
+            self.order = np.arange(n)
+        lo = x - r
+        self.order = self.order[np.argsort(lo[self.order], kind="stable")]
+        sorted_lo = lo[self.order]
+        sorted_hi = (x + r)[self.order]
+
+        # 並び順で自分より後ろにあり、左端が自分の右端以下のものが x 区間の重なる相手
+        ends = np.searchsorted(sorted_lo, sorted_hi, side="right")
+        counts = ends - np.arange(n) - 1
+        first = np.repeat(np.arange(n), counts)
+        starts = np.cumsum(counts) - counts
+        second = first + 1 + np.arange(len(first)) - np.repeat(starts, counts)
+        a = self.order[first]
+        b = self.order[second]
+
+        # 外接円どうしの距離で絞り込む
+        dx = x[a] - x[b]
+        dy = y[a] - y[b]
+        hit = dx * dx + dy * dy <= (r[a] + r[b]) ** 2
+        return a[hit], b[hit]
+
+
+class World:
+    # N 個の OBB をまとめて動かし、ブロードフェーズで残った組だけ SAT で衝突を解く
+    # ccd=True なら移動の途中でぶつかる組を衝突時刻で止めるので、細かいステップや速度の上限がいらない
+    # 接触は 2 点の接触多様体にして、ウォームスタート付きの逐次インパルス法で iterations 回解く
+    # bounds=True なら画面の端で外接円を跳ね返す（床や壁を動かない OBB で置く時は False）
+    # 接触でつながった物体（島）が time_to_sleep の間ずっと遅ければ、島ごと眠らせて計算を省く
+    def __init__(self, width, height, max_speed=None, max_omega=None, ccd=False, ccd_tolerance=0.1,
+                 gravity=0.0, iterations=8, restitution=0.0, friction=0.3, bounds=True,
+                 allow_sleep=True, sleep_speed=0.1, sleep_omega=0.02, time_to_sleep=15.0):
+        self.width = width
+        self.height = height
+        self.max_speed = max_speed  # None なら速度を抑えない
+        self.max_omega = max_omega
+        self.ccd = ccd
+        self.ccd_tolerance = ccd_tolerance
+        self.gravity = gravity
+        self.bounds = bounds
+        self.allow_sleep = allow_sleep
+        self.sleep_speed = sleep_speed  # これより遅い間は眠るまでの時間を数える
+        self.sleep_omega = sleep_omega
+        self.time_to_sleep = time_to_sleep  # 30fps の 1 フレームが 1
+        self.bodies = []
+        self.broadphase = SweepAndPrune()
+        self.swept_broadphase = SweepAndPrune()
+        self.solver = ContactSolver(iterations, restitution, friction)
+        self.contact_pairs = np.zeros(0, dtype=np.intp)  # 接触点のある組（i * N + j）。CCD では調べない
+        self.pair_count = 0  # 直近のステップで SAT にかけた組の数
+        self.impact_count = 0  # 直近のステップで衝突時刻まで戻した組の数
+        self.contact_count = 0  # 直近のステップで解いた接触点の数
+        self.sleeping_count = 0  # 眠っている物体の数
+        self.timings = dict.fromkeys(PHASES, 0)  # 直近のステップの処理段ごとの時間 [ns]
+        # 全部の物体の (cx, cy, w, h, angle)・頂点・外接円の半径（動いた物体の行だけ計算し直す）
+        self.poses = np.zeros((0, 5))
+        self.vertices = np.zeros((0, 4, 2))
+        self.radii = np.zeros(0)
+
+    def add(self, body):
+        self.bodies.append(body)
+        return body
+
+    def update_geometry(self):
+        # 位置・角度・大きさが前回から変わった物体だけ、頂点と半径をまとめて計算し直す
+        # （眠っている物体や壁は前の値をそのまま使う）
+        pose = np.array([(body.cx, body.cy, body.w, body.h, body.angle) for body in self.bodies],
+                        dtype=np.float64).reshape(-1, 5)
+        if len(pose) != len(self.poses):
+            self.poses = np.full_like(pose, np.nan)
+            self.vertices = np.zeros((len(pose), 4, 2))
+            self.radii = np.zeros(len(pose))
+        dirty = np.flatnonzero((pose != self.poses).any(axis=1))
+        if len(dirty):
+            changed = pose[dirty]
+            self.poses[dirty] = changed
+            self.vertices[dirty] = obb_vertices(*changed.T)
+            self.radii[dirty] = np.hypot(changed[:, 2], changed[:, 3]) / 2
+
+    def candidate_pairs(self):
+        # 組は (小さい添字, 大きい添字) にそろえる（接触のキャッシュが前のステップと対応するように）
+        self.update_geometry()
+        a, b = self.broadphase.pairs(self.poses[:, 0], self.poses[:, 1], self.radii)
+        return np.minimum(a, b), np.maximum(a, b)
+
+    def advance(self, dt):
+        # 1 ステップ分の移動の途中でぶつかる組を探し、各物体を一番早い衝突時刻までだけ進める
+        # 残りの時間は捨てて、ぶつかった組を返す（止まった組は次のステップで接触として跳ね返る）
+        # 位置と半径は collect_contacts で求めたものをそのまま使う（速度を解いただけで、まだ動かしていない）
+        vx, vy, omega = np.array([(body.vx, body.vy, body.omega) for body in self.bodies], dtype=np.float64).reshape(-1, 3).T
+        x = self.poses[:, 0] + vx * (dt / 2)
+        y = self.poses[:, 1] + vy * (dt / 2)
+        r = self.radii + np.hypot(vx, vy) * (dt / 2)
+        a, b = self.swept_broadphase.pairs(x, y, r)
+        a, b = np.minimum(a, b), np.maximum(a, b)
+        # 接触点のある組は投機的接触で近づく速さを抑えてあるので、衝突時刻を探さない
+        # 眠っている物体と動かない物体だけの組も調べない
+        moving = self.moving_mask()
+        free = ~np.isin(a * len(self.bodies) + b, self.contact_pairs) & (moving[a] | moving[b])
+        a, b = a[free], b[free]
+
+        states = np.vstack([self.poses.T, vx, vy, omega])  # (8, N) cx, cy, w, h, angle, vx, vy, omega
+        toi = times_of_impact(states[:, a], states[:, b], dt, self.ccd_tolerance)
+        hit = ~np.isnan(toi)
+        # 最初から接している組（toi = 0）は止めない（隙間が大きい方向にだけ押されて挟まってしまう）
+        clamp = hit & (toi > 0)
+        times = np.full(len(self.bodies), float(dt))
+        np.minimum.at(times, a[clamp], toi[clamp])
+        np.minimum.at(times, b[clamp], toi[clamp])
+        impacts = list(zip(a[hit].tolist(), b[hit].tolist()))
+        for body, t in zip(self.bodies, times.tolist()):
+            if body.awake:
+                body.move(t)
+        self.impact_count = len(impacts)
+        return impacts
+
+    def step(self, dt):
+        # 今の位置で接触を集める（眠っている物体に近づいていたら起こす） → 重力 → 速度を解く → 位置を進める の順
+        # （解いた速度でそのまま動かすので、床の上の箱が沈んでいかない）
+        # 全部眠っていれば何もしない
+        clock = time.perf_counter_ns
+        self.timings = dict.fromkeys(PHASES, 0)
+        if not self.moving_mask().any():
+            self.pair_count = self.impact_count = self.contact_count = 0
+            return
+
+        contacts = self.collect_contacts()
+        t1 = clock()
+        if self.gravity:
+            for body in self.bodies:
+                if body.inv_mass and body.awake:
+                    body.vy += self.gravity * dt
+        self.contact_count = self.solver.solve(self.bodies, contacts, dt, RESTING_STEPS * abs(self.gravity) * dt)
+        t2 = clock()
+
+        if self.ccd:
+            self.advance(dt)
+        else:
+            for body in self.bodies:
+                if body.awake:
+                    body.move(dt)
+        t3 = clock()
+
+        for body, r in zip(self.bodies, self.radii.tolist()):
+            if body.inv_mass and body.awake:
+                self.constrain(body, r)
+        t4 = clock()
+        if self.allow_sleep:
+            self.update_sleep(contacts, dt)
+        t5 = clock()
+        self.timings.update(solve=t2 - t1, move=t3 - t2, bounds=t4 - t3, sleep=t5 - t4)
+
+    def moving_mask(self):
+        # 起きていて動ける物体 (N,)
+        return np.array([body.awake and body.inv_mass > 0 for body in self.bodies], dtype=bool)
+
+    def collect_contacts(self):
+        # 処理段ごとの時間を timings の broadphase・narrowphase・manifold に入れる
+        clock = time.perf_counter_ns
+        t0 = clock()
+        none = np.zeros(0, dtype=np.intp)
+        contacts = (none, none, np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0), none)
+        self.contact_pairs = none
+        a, b = self.candidate_pairs()
+        self.pair_count = 0
+        t1 = clock()
+        self.timings["broadphase"] = t1 - t0
+        if len(a):
+            # 候補の組の SAT と接触点の切り出しをまとめて解く（頂点は candidate_pairs で更新済み）
+            verts = self.vertices
+            k = len(a)
+            tested = np.zeros(k, dtype=bool)
+            colliding = np.zeros(k, dtype=bool)
+            overlap = np.zeros(k)
+            axis = np.zeros((k, 2))
+            contact = np.zeros((k, 2))
+            reference = np.zeros(k, dtype=np.intp)
+            # 動いている物体を含む組だけ調べる。眠っている物体に近づいていたら島ごと起こして、その島の組も調べる
+            dynamic = np.array([body.inv_mass > 0 for body in self.bodies], dtype=bool)
+            while True:
+                moving = self.moving_mask()
+                new = np.flatnonzero(~tested & (moving[a] | moving[b]))
+                if not len(new):
+                    break
+                tested[new] = True
+                colliding[new], overlap[new], axis[new], contact[new], reference[new] = sat_batch(verts[a[new]], verts[b[new]])
+                near = new[colliding[new] | (overlap[new] >= -SPECULATIVE_DISTANCE)]
+                touched = np.unique(np.concatenate([a[near], b[near]]))
+                sleepers = touched[dynamic[touched] & ~moving[touched]]
+                if not len(sleepers):
+                    break
+                for i in sleepers.tolist():
+                    self.bodies[i].wake()
+            self.pair_count = int(tested.sum())
+            t2 = clock()
+            self.timings["narrowphase"] = t2 - t1
+
+            # 少し離れている組も接触にする（食い込みが負の投機的接触。隙間が埋まる速さまでしか近づけない）
+            # 離れている組の SAT の軸は一番離れている軸なので、そのまま参照辺に使える
+            # 切り出した点は遠くても全部残す（1 点だけだと、その点を支点に回って反対の角が抜けてしまう）
+            hit = np.flatnonzero(tested & (colliding | (overlap >= -SPECULATIVE_DISTANCE)))
+            a, b = a[hit], b[hit]
+            pair, points, depth, feature = clip_manifolds(verts[a], verts[b], axis[hit], reference[hit],
+                                                          overlap[hit], contact[hit], np.inf)
+            normals = axis[hit][pair]
+            self.contact_pairs = np.unique(a[pair] * len(self.bodies) + b[pair])
+            contacts = (a[pair], b[pair], normals, points, depth, feature)
+            self.timings["manifold"] = clock() - t2
+        return contacts
+
+    def update_sleep(self, contacts, dt):
+        # 接触でつながった動く物体をまとめて島にする（動かない物体は島をつながない。床で全部がつながらないように）
+        parent = list(range(len(self.bodies)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in zip(contacts[0].tolist(), contacts[1].tolist()):
+            if self.bodies[i].inv_mass and self.bodies[j].inv_mass:
+                parent[find(i)] = find(j)
+
+        # 遅いままの時間を数え、島の全員が time_to_sleep を超えたら島ごと止めて眠らせる
+        islands = {}
+        for k, body in enumerate(self.bodies):
+            if body.inv_mass and body.awake:
+                slow = math.hypot(body.vx, body.vy) < self.sleep_speed and abs(body.omega) < self.sleep_omega
+                body.sleep_time = body.sleep_time + dt if slow else 0.0
+                islands.setdefault(find(k), []).append(body)
+        for island in islands.values():
+            if min(body.sleep_time for body in island) >= self.time_to_sleep:
+                for body in island:
+                    body.awake = False
+                    body.vx = body.vy = body.omega = 0.0
+                    body.island = island
+        self.sleeping_count = sum(1 for body in self.bodies if body.inv_mass and not body.awake)
+
+    def constrain(self, obb, r):
+        # 画面の端で跳ね返し、速度と角速度を上限で抑える（r は外接円の半径）
+        if self.bounds:
+            if obb.cx - r < 0 or obb.cx + r > self.width:
+                obb.vx *= -1
+                obb.cx = max(r, min(self.width - r, obb.cx))
+            if obb.cy - r < 0 or obb.cy + r > self.height:
+                obb.vy *= -1
+                obb.cy = max(r, min(self.height - r, obb.cy))
+
+        speed = math.hypot(obb.vx, obb.vy)
+        if self.max_speed is not None and speed > self.max_speed:
+            scale = self.max_speed / speed
+            obb.vx *= scale
+            obb.vy *= scale
+        if self.max_omega is not None and abs(obb.omega) > self.max_omega:
+            obb.omega *= 0.95
@@ -0,0 +1,88 @@
+import csv
+import time
+from collections import deque
+
+import numpy as np
+
+# 物理ステップの処理段ごとの時間をフレーム単位で貯め、直近の平均と p95 を出す
+# 止めている間（enabled=False かつ記録なし）は add も end_frame もすぐ戻るので、負荷はほぼない
+
+
+class PhaseProfiler:
+    def __init__(self, phases, window=120):
+        self.phases = tuple(phases)
+        self.window = window  # 平均と p95 をとる直近のフレーム数
+        self.enabled = False
+        self.history = deque(maxlen=window)  # フレームごとの (処理段ごとの時間 [ns], ..., 合計)
+        self.current = dict.fromkeys(self.phases, 0)
+        self.steps = 0  # このフレームで回した物理ステップの数
+        self.frame = 0
+        self.trace = None  # CSV に書き出すまで貯めておく行（記録していない時は None）
+        self.trace_path = None
+
+    @property
+    def active(self):
+        return self.enabled or self.trace is not None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.history.clear()
+
+    def add(self, timings):
+        # 物理ステップ 1 回分の処理段ごとの時間 [ns] を今のフレームに足す
+        if not self.active:
+            return
+        for phase in self.phases:
+            self.current[phase] += timings.get(phase, 0)
+        self.steps += 1
+
+    def end_frame(self):
+        # 今のフレームの合計を履歴（と CSV の記録）に移す
+        if not self.active:
+            return
+        row = [self.current[phase] for phase in self.phases]
+        row.append(sum(row))
+        self.history.append(row)
+        if self.trace is not None:
+            self.trace.append([self.frame, self.steps] + row)
+        self.current = dict.fromkeys(self.phases, 0)
+        self.steps = 0
+        self.frame += 1
+
+    def summary(self):
+        # 処理段（と合計）ごとの直近の平均・p95 [ms]
+        names = self.phases + ("total",)
+        if not self.history:
+            return [(name, 0.0, 0.0) for name in names]
+        ms = np.array(self.history, dtype=np.float64) / 1e6
+        return list(zip(names, ms.mean(axis=0).tolist(), np.percentile(ms, 95, axis=0).tolist()))
+
+    def overlay_lines(self):
+        # 画面に重ねて表示する文字列
+        lines = [f"{'PHASE':<12}{'AVG':>6}{'P95':>6} ms"]
+        for name, avg, p95 in self.summary():
+            lines.append(f"{name.upper():<12}{avg:6.2f}{p95:6.2f}")
+        if self.trace is not None:
+            lines.append(f"REC {len(self.trace)}")
+        return lines
+
+    def start_trace(self, path=None):
+        self.trace = []
+        self.trace_path = path or time.strftime("trace_%Y%m%d_%H%M%S.csv")
+
+    def stop_trace(self):
+        # 貯めたフレームを CSV に書き出して、書き出したファイル名を返す（時間は ns）
+        if self.trace is None:
+            return None
+        with open(self.trace_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "steps", *self.phases, "total"])
+            writer.writerows(self.trace)
+        self.trace = None
+        return self.trace_path
+
+    def toggle_trace(self, path=None):
+        if self.trace is None:
+            self.start_trace(path)
+            return None
+        return self.stop_trace()
@@ -0,0 +1,101 @@
+from collections import deque
+
+import numpy as np
+
+from obb_world import OBB
+
+# World の状態を詰めた配列に写し取り、あとで同じ状態に戻す（巻き戻して同じ操作をすれば同じ結果になる）
+# 物体ごとの値は (N, len(BODY_FIELDS)) の float64 の配列 1 つにまとめるので、毎フレーム取っても軽い
+# 接触の向きや並び順で結果が変わるので、ブロードフェーズの並び順とウォームスタートのインパルスも一緒に戻す
+
+BODY_FIELDS = ("cx", "cy", "angle", "vx", "vy", "omega", "mass", "w", "h", "awake", "sleep_time", "island")
+HISTORY_SIZE = 300  # 巻き戻せるフレーム数（30fps で 10 秒）
+
+
+class WorldSnapshot:
+    __slots__ = ("bodies", "order", "swept_order", "cache", "gravity", "restitution")
+
+    def __init__(self, bodies, order, swept_order, cache, gravity, restitution):
+        self.bodies = bodies  # (N, len(BODY_FIELDS))。island は一緒に眠った物体の組の番号（起きていれば -1）
+        self.order = order
+        self.swept_order = swept_order
+        self.cache = cache
+        self.gravity = gravity
+        self.restitution = restitution
+
+
+def capture_world(world):
+    islands = {}
+    rows = [(body.cx, body.cy, body.angle, body.vx, body.vy, body.omega, body.mass, body.w, body.h,
+             body.awake, body.sleep_time, -1 if body.island is None else islands.setdefault(id(body.island), len(islands)))
+            for body in world.bodies]
+    # ソルバは毎ステップ新しい配列に置き換えるので、前回のインパルスは写さずにそのまま持っておける
+    return WorldSnapshot(np.array(rows, dtype=np.float64).reshape(-1, len(BODY_FIELDS)),
+                         world.broadphase.order.copy(), world.swept_broadphase.order.copy(),
+                         world.solver.cache, world.gravity, world.solver.restitution)
+
+
+def restore_world(world, snapshot):
+    # 取った後に増えた物体は消し、減った物体は作り直す（それ以外の物体はそのまま使うので、参照は切れない）
+    # 大きさや質量が変わっていれば、慣性モーメントなどの派生した値も一緒に求め直す
+    rows = snapshot.bodies.tolist()
+    del world.bodies[len(rows):]
+    for cx, cy, angle, vx, vy, omega, mass, w, h, awake, sleep_time, island in rows[len(world.bodies):]:
+        world.add(OBB(cx, cy, w, h, mass=mass))
+
+    islands = {}
+    for body, (cx, cy, angle, vx, vy, omega, mass, w, h, awake, sleep_time, island) in zip(world.bodies, rows):
+        if (body.w, body.h, body.mass) != (w, h, mass):
+            body.set_shape(w, h, mass)
+        body.cx, body.cy, body.angle = cx, cy, angle
+        body.vx, body.vy, body.omega = vx, vy, omega
+        body.awake = bool(awake)
+        body.sleep_time = sleep_time
+        body.island = None
+        if island >= 0:
+            body.island = islands.setdefault(island, [])
+            body.island.append(body)
+
+    world.broadphase.order = snapshot.order.copy()
+    world.swept_broadphase.order = snapshot.swept_order.copy()
+    world.solver.cache = snapshot.cache
+    world.gravity = snapshot.gravity
+    world.solver.restitution = snapshot.restitution
+    world.sleeping_count = sum(1 for body in world.bodies if body.inv_mass and not body.awake)
+
+
+class SnapshotRing:
+    # 直近 capacity フレーム分の状態を貯める（古いものから捨てる）
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.snapshots = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def push(self, snapshot):
+        self.snapshots.append(snapshot)
+
+    def pop(self):
+        # 一番新しい状態を取り出す（巻き戻した後に進めれば、そこから先の履歴が作り直される）。なければ None
+        return self.snapshots.pop() if self.snapshots else None
+
+    def advance(self, sim, timestep, rewind=False):
+        # デモの update で 1 フレームに 1 回呼ぶ。このフレームで進めるステップ数を返す
+        # rewind なら一番新しい状態に戻して None を返す（押している間は 1 フレームずつ戻り、離すとそこから進め直す）
+        # 進める時は、進める前に今画面に出ている状態を積む（巻き戻すと 1 回目から 1 フレーム前に戻る）
+        if rewind:
+            snapshot = self.pop()
+            if snapshot is not None:
+                sim.restore(snapshot)
+            return None
+        steps = timestep.advance()
+        if steps:
+            self.push(sim.snapshot())
+        return steps
+
+    def peek(self, back=0):
+        # back フレーム前の状態（取り出さない）。なければ None
+        return self.snapshots[-1 - back] if back < len(self.snapshots) else None
+
+    def clear(self):
+        self.snapshots.clear()
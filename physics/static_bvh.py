@@ -0,0 +1,149 @@
+import numpy as np
+
+from geometry import point_segment_distances
+
+# 動かない線分の集まり（レベルの地形）に、境界ボックスの木（BVH）を最初に 1 回だけ作る
+# 問い合わせでは木をたどって範囲に重なる葉だけを集め、その線分をまとめて配列で調べる
+# （線分が何千本あっても、調べるのはボールの近くの数本〜数十本で済む）
+
+LEAF_SIZE = 4  # 葉に入れる線分の数
+
+
+class StaticBVH:
+    def __init__(self, seg_a, seg_b, leaf_size=LEAF_SIZE):
+        # 線分 a → b (M, 2) の集まりから木を作る
+        seg_a = np.asarray(seg_a, dtype=np.float64).reshape(-1, 2)
+        seg_b = np.asarray(seg_b, dtype=np.float64).reshape(-1, 2)
+        lo = np.minimum(seg_a, seg_b)
+        hi = np.maximum(seg_a, seg_b)
+        centers = (lo + hi) / 2
+
+        # 節：(x0, y0, x1, y1, 左の子, 右の子, 葉の線分の始まり, 終わり)。葉は子が -1
+        # 葉の線分が連続するように並べ替えた順番を order に貯める
+        self.nodes = []
+        order = []
+
+        def build(idx):
+            node = len(self.nodes)
+            self.nodes.append(None)
+            box = (*lo[idx].min(axis=0).tolist(), *hi[idx].max(axis=0).tolist())
+            if len(idx) <= leaf_size:
+                self.nodes[node] = (*box, -1, -1, len(order), len(order) + len(idx))
+                order.extend(idx.tolist())
+                return node
+            # 中心が一番広がっている向きで、中央値で半分に分ける
+            axis = int(np.ptp(centers[idx], axis=0).argmax())
+            idx = idx[np.argsort(centers[idx, axis], kind="stable")]
+            half = len(idx) // 2
+            left = build(idx[:half])
+            right = build(idx[half:])
+            self.nodes[node] = (*box, left, right, 0, 0)
+            return node
+
+        if len(seg_a):
+            build(np.arange(len(seg_a)))
+        self.index = np.array(order, dtype=np.intp)  # 並べ替えた位置 → 元の線分の番号
+        self.seg_a = seg_a[self.index]
+        self.seg_b = seg_b[self.index]
+
+    @classmethod
+    def from_polygons(cls, polygons, closed=True, leaf_size=LEAF_SIZE):
+        # 多角形（頂点の列）のリストから、各辺を線分にして木を作る
+        seg_a = []
+        seg_b = []
+        for polygon in polygons:
+            verts = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+            ends = np.roll(verts, -1, axis=0) if closed else verts[1:]
+            seg_a.append(verts[:len(ends)])
+            seg_b.append(ends)
+        if not seg_a:
+            return cls(np.zeros((0, 2)), np.zeros((0, 2)), leaf_size)
+        return cls(np.concatenate(seg_a), np.concatenate(seg_b), leaf_size)
+
+    def __len__(self):
+        return len(self.seg_a)
+
+    def candidates(self, x0, y0, x1, y1):
+        # 範囲 [x0, x1] × [y0, y1] と境界ボックスが重なる葉の線分（並べ替えた位置）
+        ranges = []
+        stack = [0] if self.nodes else []
+        while stack:
+            nx0, ny0, nx1, ny1, left, right, start, end = self.nodes[stack.pop()]
+            if nx0 > x1 or nx1 < x0 or ny0 > y1 or ny1 < y0:
+                continue
+            if left < 0:
+                ranges.append(np.arange(start, end))
+            else:
+                stack.append(left)
+                stack.append(right)
+        return np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.intp)
+
+    def closest(self, x, y, r):
+        # 点 (x, y) から r 以内で一番近い線分 → (線分の番号, 距離, 最近点 (x, y))。なければ None
+        idx = self.candidates(x - r, y - r, x + r, y + r)
+        if not len(idx):
+            return None
+        dists, points = point_segment_distances(np.array([[x, y]], dtype=np.float64), self.seg_a[idx], self.seg_b[idx])
+        k = int(dists[0].argmin())
+        if dists[0, k] > r:
+            return None
+        return int(self.index[idx[k]]), float(dists[0, k]), tuple(points[0, k].tolist())
+
+    def sweep(self, x0, y0, x1, y1, r):
+        # 半径 r の円が (x0, y0) → (x1, y1) と動く間に最初に当たる線分
+        # → (時刻 0〜1, 線分の番号, 当たった面の法線 (nx, ny)（円の側を向く）)。当たらなければ None
+        # 最初から重なっていて近づく向きに動く線分は時刻 0 で当たったことにする（離れていく向きなら無視）
+        idx = self.candidates(min(x0, x1) - r, min(y0, y1) - r, max(x0, x1) + r, max(y0, y1) + r)
+        if not len(idx):
+            return None
+        a = self.seg_a[idx]
+        b = self.seg_b[idx]
+        dx = x1 - x0
+        dy = y1 - y0
+
+        # 面：線分の直線から r 離れた平行線に、円の中心がある側から当たる時刻
+        ex = b[:, 0] - a[:, 0]
+        ey = b[:, 1] - a[:, 1]
+        length = np.hypot(ex, ey)
+        safe = np.where(length > 0, length, 1.0)
+        nx = -ey / safe
+        ny = ex / safe
+        s0 = (x0 - a[:, 0]) * nx + (y0 - a[:, 1]) * ny
+        side = np.where(s0 >= 0, 1.0, -1.0)
+        nx = nx * side
+        ny = ny * side
+        approach = -(dx * nx + dy * ny)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_face = np.maximum(0.0, (np.abs(s0) - r) / approach)
+            u = ((x0 + dx * t_face - a[:, 0]) * ex + (y0 + dy * t_face - a[:, 1]) * ey) / (safe * safe)
+        face_hit = (length > 0) & (approach > 0) & (t_face <= 1) & (u >= 0) & (u <= 1)
+        t_face = np.where(face_hit, t_face, np.inf)
+
+        # 端点：半径 r の円に当たる時刻（|p0 + t d - e|^2 = r^2 の小さい方の解）
+        dd = dx * dx + dy * dy
+        best_t = t_face
+        best_nx = nx
+        best_ny = ny
+        for e in (a, b):
+            mx = x0 - e[:, 0]
+            my = y0 - e[:, 1]
+            md = mx * dx + my * dy
+            c = mx * mx + my * my - r * r
+            disc = md * md - dd * c
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t_cap = np.where(c < 0, 0.0, (-md - np.sqrt(np.maximum(disc, 0.0))) / dd)
+            cap_hit = (dd > 0) & (md < 0) & (disc >= 0) & (t_cap <= 1)
+            t_cap = np.where(cap_hit, t_cap, np.inf)
+            cx = mx + dx * np.where(cap_hit, t_cap, 0.0)
+            cy = my + dy * np.where(cap_hit, t_cap, 0.0)
+            dist = np.hypot(cx, cy)
+            dist = np.where(dist > 0, dist, 1.0)
+            closer = t_cap < best_t
+            best_t = np.where(closer, t_cap, best_t)
+            best_nx = np.where(closer, cx / dist, best_nx)
+            best_ny = np.where(closer, cy / dist, best_ny)
+
+        k = int(best_t.argmin())
+        if not np.isfinite(best_t[k]):
+            return None
+        return float(best_t[k]), int(self.index[idx[k]]), (float(best_nx[k]), float(best_ny[k]))
@@ -0,0 +1,181 @@
+"""PNG をまとめて Pyxel のイメージバンク（256x256 × 3）に詰め込むツール
+
+    python atlas_packer.py <PNG のディレクトリ> <出力ディレクトリ>
+
+出力ディレクトリには bank0.png〜 と atlas.json（名前 → (bank, u, v, w, h)）ができる。
+入力 PNG・パレット・詰め方の設定が前回と同じで、出力もそろっていれば何もしない。ゲーム側は load_atlas() で読み込む。
+"""
+import json
+import os
+import sys
+
+import pyxel
+
+# パレットへの減色は camera/ のものを共用する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "camera"))
+
+BANK_SIZE = 256
+MANIFEST = "atlas.json"
+
+
+class Skyline:
+    # スカイライン法（bottom-left）で 1 枚のバンクに矩形を置いていく
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.segments = [[0, 0, width]]  # [x, y, w]：x から w の幅の高さ y
+
+    def _fit(self, i, w, h):
+        # segments[i] の左端に置いた時の y（入らなければ None）
+        x = self.segments[i][0]
+        if x + w > self.width:
+            return None
+        y = 0
+        remaining = w
+        while remaining > 0:
+            sx, sy, sw = self.segments[i]
+            y = max(y, sy)
+            if y + h > self.height:
+                return None
+            remaining -= sw
+            i += 1
+        return y
+
+    def find(self, w, h):
+        # 上端が最も低く、同じなら最も左の位置
+        best = None
+        for i in range(len(self.segments)):
+            y = self._fit(i, w, h)
+            if y is not None and (best is None or (y + h, self.segments[i][0]) < best[0]):
+                best = ((y + h, self.segments[i][0]), i, y)
+        return best
+
+    def place(self, i, w, h, y):
+        x = self.segments[i][0]
+        self.segments.insert(i, [x, y + h, w])
+        # 新しい段に覆われた部分を削る
+        j = i + 1
+        while j < len(self.segments):
+            sx, sy, sw = self.segments[j]
+            end = x + w
+            if sx >= end:
+                break
+            if sx + sw <= end:
+                del self.segments[j]
+            else:
+                self.segments[j] = [end, sy, sx + sw - end]
+                break
+        # 同じ高さの隣り合う段をまとめる
+        merged = [self.segments[0]]
+        for seg in self.segments[1:]:
+            if seg[1] == merged[-1][1]:
+                merged[-1][2] += seg[2]
+            else:
+                merged.append(seg)
+        self.segments = merged
+        return x, y
+
+
+def pack_rects(sizes, banks=3, bank_size=BANK_SIZE, padding=0):
+    # sizes: {名前: (w, h)} → {名前: (bank, u, v, w, h)}。入り切らなければ ValueError
+    skylines = [Skyline(bank_size, bank_size) for _ in range(banks)]
+    placed = {}
+    # 背の高いもの・幅の広いものから置く
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        pw, ph = w + padding, h + padding
+        for bank, skyline in enumerate(skylines):
+            best = skyline.find(pw, ph)
+            if best is not None:
+                _, i, y = best
+                u, v = skyline.place(i, pw, ph, y)
+                placed[name] = (bank, u, v, w, h)
+                break
+        else:
+            raise ValueError(f"{name} ({w}x{h}) が {banks} 枚のイメージバンクに入りません")
+    return placed
+
+
+def input_fingerprint(src_dir, colors, banks, padding, colkey):
+    # 入力 PNG の名前・サイズ・更新時刻とパレット・詰め方の設定（変わっていなければ再生成しない）
+    files = []
+    for filename in sorted(os.listdir(src_dir)):
+        if filename.lower().endswith(".png"):
+            stat = os.stat(os.path.join(src_dir, filename))
+            files.append([filename, stat.st_size, stat.st_mtime_ns])
+    return {"files": files, "colors": list(colors), "banks": banks, "padding": padding, "colkey": colkey}
+
+
+def bank_path(out_dir, bank):
+    return os.path.join(out_dir, f"bank{bank}.png")
+
+
+def with_tuples(manifest):
+    # スプライトの矩形は作り直した時も JSON から読んだ時も (bank, u, v, w, h) のタプルで返す
+    return dict(manifest, sprites={name: tuple(rect) for name, rect in manifest["sprites"].items()})
+
+
+def build_atlas(src_dir, out_dir, banks=3, padding=0, colkey=0):
+    # 入力と設定が前回と同じで、バンクの PNG も全部残っていればマニフェストをそのまま返す
+    colors = list(pyxel.colors)
+    fingerprint = input_fingerprint(src_dir, colors, banks, padding, colkey)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("inputs") == fingerprint and all(
+                os.path.exists(bank_path(out_dir, bank)) for bank in range(manifest["banks"])):
+            return with_tuples(manifest)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    # Pillow / NumPy は再生成する時だけ使う
+    import numpy as np
+    from PIL import Image
+    from frame_utils import palette_rgb, rgb_to_palette_indices
+
+    pal = palette_rgb(colors)
+    images = {}
+    for filename, _, _ in fingerprint["files"]:
+        name = os.path.splitext(filename)[0]
+        rgba = np.asarray(Image.open(os.path.join(src_dir, filename)).convert("RGBA"))
+        # 最近傍のパレット色に減色（透明な画素は colkey）
+        indices = rgb_to_palette_indices(rgba[:, :, :3], pal)
+        indices[rgba[:, :, 3] == 0] = colkey
+        images[name] = indices
+
+    sprites = pack_rects({name: (a.shape[1], a.shape[0]) for name, a in images.items()}, banks, BANK_SIZE, padding)
+    used = sorted({bank for bank, *_ in sprites.values()})
+    bank_data = np.full((len(used), BANK_SIZE, BANK_SIZE), colkey, dtype=np.uint8)
+    for name, (bank, u, v, w, h) in sprites.items():
+        bank_data[bank, v:v + h, u:u + w] = images[name]
+
+    # パレット PNG で保存（pyxel の load で同じインデックスに戻る）
+    os.makedirs(out_dir, exist_ok=True)
+    flat_palette = pal.ravel().tolist()
+    for bank in used:
+        img = Image.fromarray(bank_data[bank], mode="P")
+        img.putpalette(flat_palette)
+        img.save(bank_path(out_dir, bank))
+
+    manifest = {"inputs": fingerprint, "banks": len(used), "sprites": sprites}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return with_tuples(manifest)
+
+
+def load_atlas(out_dir):
+    # bank*.png をイメージバンクへ読み込み、{名前: (bank, u, v, w, h)} を返す（Pillow 不要）
+    with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for bank in range(manifest["banks"]):
+        pyxel.images[bank].load(0, 0, bank_path(out_dir, bank))
+    return {name: tuple(rect) for name, rect in manifest["sprites"].items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    result = build_atlas(sys.argv[1], sys.argv[2])
+    for name, (bank, u, v, w, h) in sorted(result["sprites"].items()):
+        print(f"{name}: bank={bank} u={u} v={v} w={w} h={h}")
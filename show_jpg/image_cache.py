@@ -0,0 +1,78 @@
+import glob
+import hashlib
+import os
+import struct
+import sys
+
+import numpy as np
+import pyxel
+
+# パレットへの減色は camera/ のものを共用する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "camera"))
+
+# 縮小・減色済みのパレットインデックスを保存する場所
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".image_cache")
+
+# キャッシュファイル: 16 バイトのヘッダ + width×height の uint8 インデックス
+MAGIC = b"PYXIDX1\0"
+HEADER = struct.Struct("<8sII")  # magic, width, height
+
+
+def cache_prefix(path, size):
+    # 元画像のパスとサイズごとのファイル名の頭（更新時刻やパレットが変わった古いキャッシュを探すのに使う）
+    key = f"{os.path.abspath(path)}|{size[0]}x{size[1]}"
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def cache_path(path, size, colors):
+    # 元画像のパス・更新時刻・サイズ・パレットが同じなら同じキャッシュを使う
+    stat = os.stat(path)
+    key = f"{stat.st_mtime_ns}|{','.join(f'{c:06x}' for c in colors)}"
+    return f"{cache_prefix(path, size)}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.idx"
+
+
+def build_cache(path, size, colors, cache_file):
+    # Pillow と減色の処理はキャッシュを作り直す時だけ読み込む（キャッシュがあれば起動はファイル 1 回の読み込みで済む）
+    from PIL import Image
+    from frame_utils import palette_rgb, rgb_to_palette_indices
+
+    # 最近傍の pyxel.colors インデックスに減色
+    indices = rgb_to_palette_indices(np.asarray(Image.open(path).resize(size).convert("RGB")), palette_rgb(colors))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = cache_file + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size[0], size[1]))
+        f.write(indices.tobytes())
+    os.replace(tmp, cache_file)  # 書きかけのファイルを読まないよう最後に置き換える
+    # 同じ画像・サイズの古いキャッシュ（元画像の更新前やパレット変更前のもの）は消す
+    for old in glob.glob(glob.escape(cache_prefix(path, size)) + "-*.idx"):
+        if old != cache_file:
+            os.remove(old)
+    return indices
+
+
+def load_image(image, x, y, path, size):
+    # path の画像を size に縮小・減色してイメージバンクの (x, y) に置く
+    # 2 回目以降はキャッシュファイルを 1 回読むだけで済む
+    colors = list(pyxel.colors)
+    cache_file = cache_path(path, size, colors)
+    width, height = size
+    bank = np.ctypeslib.as_array(image.data_ptr()).reshape(image.height, image.width)
+
+    try:
+        with open(cache_file, "rb") as f:
+            magic, w, h = HEADER.unpack(f.read(HEADER.size))
+            if magic == MAGIC and (w, h) == (width, height):
+                if x == 0 and width == image.width:
+                    # 行が連続しているのでイメージバンクへ直接読み込む
+                    if f.readinto(memoryview(bank[y:y + height]).cast("B")) == width * height:
+                        return
+                else:
+                    data = np.fromfile(f, dtype=np.uint8, count=width * height)
+                    if data.size == width * height:
+                        bank[y:y + height, x:x + width] = data.reshape(height, width)
+                        return
+    except FileNotFoundError:
+        pass
+
+    bank[y:y + height, x:x + width] = build_cache(path, size, colors, cache_file)
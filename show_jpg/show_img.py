@@ -1,25 +1,13 @@
 import pyxel
-from PIL import Image
-import tempfile
-import os
+from image_cache import load_image
 
 class App:
     def __init__(self):
         pyxel.init(256, 256, title="Resized Image Display")
 
-        # 画像をPillowで読み込んでリサイズ（最大256x256）
-        img = Image.open("airpocket.png").resize((256, 256))
-
-        # 一時ファイルに保存（自動削除される）
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            img.save(tmp.name)
-            temp_path = tmp.name
-
-        # Pyxelに画像を読み込ませる
-        pyxel.image(0).load(0, 0, temp_path)
-
-        # 一時ファイルを削除
-        os.remove(temp_path)
+        # 画像を256x256に縮小・減色してPyxelに読み込む
+        # （結果はキャッシュされ、2回目以降はキャッシュファイルを読むだけ）
+        load_image(pyxel.image(0), 0, 0, "airpocket.png", (256, 256))
 
         pyxel.run(self.update, self.draw)
 